@@ -0,0 +1,200 @@
+"""
+
+Local cache for Common Crawl CDX index lookups.
+
+The raw index results of every (crawl, url pattern) pair are stored once as a
+gzipped JSON-lines file, so repeated lookups for the same domain make no index
+requests at all. Results are streamed line by line both from the index server
+and from the cache, filtered as they arrive and deduplicated to the newest
+capture per ``urlkey``, so only the surviving captures are ever held in memory.
+
+Usage:
+    python cdx_cache.py "covanta.com/*" --indexes 2023-23 2023-14
+
+"""
+
+import argparse
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import requests
+
+CDX_API_TEMPLATE = "https://index.commoncrawl.org/CC-MAIN-{index}-index"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "commoncrawl-cdx"
+DEFAULT_INDEXES = [
+    "2023-23", "2023-14", "2023-06", "2022-49", "2022-40", "2022-33", "2022-27", "2022-21", "2022-05",
+    "2021-49", "2021-43", "2021-39", "2021-31", "2021-25", "2021-21", "2021-17", "2021-10", "2021-04",
+]
+# Filters applied in commoncrawl_extract.py before downloading pages
+DEFAULT_FILTERS = {"status": "200", "mime": "text/html", "languages": "eng", "encoding": "UTF-8"}
+
+
+def stream_index(index, url_pattern, session=None):
+    """
+    Streams the results of one crawl index for a URL pattern.
+
+    Args:
+        index (str): Crawl id, e.g. ``2023-23``.
+        url_pattern (str): URL or pattern such as ``example.com/*``.
+        session: Optional requests session.
+
+    Yields:
+        dict: One CDX result per captured URL.
+    """
+    http = session or requests
+    response = http.get(
+        CDX_API_TEMPLATE.format(index=index),
+        params={"url": url_pattern, "output": "json"},
+        stream=True,
+        timeout=120,
+    )
+    # the index answers 404 when a pattern has no captures
+    if response.status_code == 404:
+        response.close()
+        return
+    response.raise_for_status()
+    with response:
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+class CdxCache:
+    """
+    On-disk cache of raw CDX results keyed by (crawl index, url pattern).
+
+    Args:
+        cache_dir (str): Directory holding the cached ``.jsonl.gz`` files.
+        session: Optional requests session used on cache misses.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, session=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.session = session or requests.Session()
+
+    def path(self, index, url_pattern):
+        digest = hashlib.sha1(url_pattern.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"CC-MAIN-{index}" / f"{digest}.jsonl.gz"
+
+    def is_cached(self, index, url_pattern):
+        return self.path(index, url_pattern).exists()
+
+    def iter_results(self, index, url_pattern, refresh=False):
+        """
+        Yields the raw results of one index, from the cache when present.
+
+        On a miss the results are written to a temporary file while they are
+        yielded, and only moved into place once the index has been read
+        completely, so an interrupted lookup never leaves a partial entry.
+        """
+        path = self.path(index, url_pattern)
+        if path.exists() and not refresh:
+            with gzip.open(path, "rt", encoding="utf-8") as cached:
+                for line in cached:
+                    yield json.loads(line)
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(temp_path, "wt", encoding="utf-8") as cached:
+                for result in stream_index(index, url_pattern, self.session):
+                    cached.write(json.dumps(result) + "\n")
+                    yield result
+            temp_path.replace(path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+
+def matches_filters(result, filters):
+    """Returns True if every filtered field of the result equals the wanted value."""
+    return all(result.get(field) == value for field, value in filters.items())
+
+
+def newest_per_urlkey(results, filters=None, latest=None):
+    """
+    Keeps the newest capture per ``urlkey`` among the results passing the
+    filters, consuming the results one at a time.
+
+    Args:
+        results: Iterable of CDX results.
+        filters (dict): Field values a result must have, e.g. DEFAULT_FILTERS.
+        latest (dict, optional): Existing ``urlkey`` mapping to update.
+
+    Returns:
+        dict: Maps every ``urlkey`` to its newest matching result.
+    """
+    latest = {} if latest is None else latest
+    filters = filters or {}
+    for result in results:
+        if not matches_filters(result, filters):
+            continue
+        current = latest.get(result["urlkey"])
+        if current is None or result["timestamp"] >= current["timestamp"]:
+            latest[result["urlkey"]] = result
+    return latest
+
+
+def search(url_pattern, indexes=DEFAULT_INDEXES, filters=DEFAULT_FILTERS, cache_dir=DEFAULT_CACHE_DIR,
+           threads=10, refresh=False):
+    """
+    Searches several crawl indexes through the cache.
+
+    Each index is read and reduced in its own thread, after which the per-index
+    captures are merged, again keeping the newest per ``urlkey``.
+
+    Args:
+        url_pattern (str): URL or pattern such as ``example.com/*``.
+        indexes (list): Crawl ids to search.
+        filters (dict): Field values a result must have. Pass an empty dict to
+            keep every capture.
+        cache_dir (str): Cache directory.
+        threads (int): Number of indexes read in parallel.
+        refresh (bool): Ignore cached entries and query the index again.
+
+    Returns:
+        list: The newest matching capture per ``urlkey``, sorted by timestamp.
+    """
+    cache = CdxCache(cache_dir)
+    latest = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(threads, 1)) as executor:
+        futures = {
+            executor.submit(newest_per_urlkey, cache.iter_results(index, url_pattern, refresh), filters): index
+            for index in indexes
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                newest_per_urlkey(future.result().values(), latest=latest)
+            except requests.exceptions.RequestException as e:
+                print(f"Warning: Could not search index {futures[future]}: {e}")
+    return sorted(latest.values(), key=lambda result: result["timestamp"])
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Cached Common Crawl index search")
+    parser.add_argument("url_pattern", help="URL or pattern such as example.com/*")
+    parser.add_argument("--indexes", nargs="+", default=DEFAULT_INDEXES, help="Crawl ids to search")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Cache directory")
+    parser.add_argument("--threads", type=int, default=10, help="Indexes searched in parallel")
+    parser.add_argument("--refresh", action="store_true", help="Query the index even for cached entries")
+    parser.add_argument("--no-filters", action="store_true", help="Keep captures of every status, mime and language")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    filters = {} if args.no_filters else DEFAULT_FILTERS
+    results = search(args.url_pattern, args.indexes, filters, args.cache_dir, args.threads, args.refresh)
+    for result in results:
+        print(result["timestamp"], result["url"])
+    print(f"Total Searched pages in Common Crawl resulted for the domain : {len(results)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,518 @@
-from bs4 import BeautifulSoup
+import codecs
+import concurrent.futures
+import json
+import time
+from html.parser import HTMLParser
+from multiprocessing import cpu_count
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
 import requests
+import requests.adapters
+
+from keyword_automaton import KeywordAutomaton
+from page_encoding import decode_html, decode_response, detect_encoding
+
+# Common keywords and phrases associated with pop-ups
+POPUP_KEYWORDS = [
+    "terms",
+    "terms of service",
+    "privacy policy",
+    "content warning",
+    "mature content",
+    "subscribe",
+    "subscription",
+    "premium",
+    "sign up",
+    "register",
+    "agree",
+    "accept",
+    "continue",
+    "confirm",
+    "verify your age",
+    "age verification",
+    "access content",
+    "unlock content",
+    "get full access",
+    "limited access",
+    "cookies"
+]
+
+# Keywords only count when they appear inside one of these elements
+POPUP_CONTAINER_TAGS = {'div', 'section', 'article', 'aside', 'main', 'footer', 'form', 'dialog'}
+
+# CSS classes, IDs and attributes that are often used for pop-ups
+POPUP_CSS_SELECTORS = [
+    ".popup",
+    ".modal",
+    ".overlay",
+    "#popup-container",
+    "#modal-window",
+    "#overlay-background",
+    "[role='dialog']",
+    "[aria-modal='true']",
+]
+
+# Elements whose strings are not visible page text
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+POPUP_AUTOMATON = KeywordAutomaton(POPUP_KEYWORDS)
+
+
+# ARIA roles whose elements and text are reported
+ARIA_ROLES = ["alertdialog", "alert", "button"]
+
+# Keywords and phrases suggesting human interaction
+INTERACTION_KEYWORDS = [
+    "login",
+    "sign in",
+    "log in",
+    "username",
+    "password",
+    "email",
+    "enter your email",
+    "age verification",
+    "verify your age",
+    "are you 18 or older?",
+    "date of birth",
+    "captcha",
+    "i'm not a robot",
+    "create account",
+    "register",
+    "subscription required",
+    "paywall",
+    "unlock premium content",
+    "enter your details",
+    "submit",
+    "continue",
+    "accept terms",
+    "agree to terms",
+]
+
+# CSS selectors for common interactive elements
+INTERACTIVE_SELECTORS = [
+    # "form",  # Look for forms (often login/registration)
+    "input[type='password']",
+    "input[type='email']",
+    "input[type='text']",
+    "button[type='submit']",
+    "a[href*='login']",
+    "a[href*='signup']",
+    "div[role='dialog']",  # Dialog boxes can require interaction
+    "iframe", # Can sometimes contain interactive elements
+]
+
+# Attributes holding the visible label of form controls, which have no text of their own
+LABEL_ATTRIBUTES = ("placeholder", "aria-label", "value", "title")
+
+INTERACTION_AUTOMATON = KeywordAutomaton(INTERACTION_KEYWORDS)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Cache-Control': 'max-age=0',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Pragma': 'no-cache',
+    # Add more Sec-Ch-Ua related headers for a more modern Chrome-like feel
+    'Sec-Ch-Ua': '"Not A(Brand";v="99", "Google Chrome";v="120", "Chromium";v="120"',
+    'Sec-Ch-Ua-Platform': '"Windows"',  # Or "macOS", "Linux", etc.
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Referer': 'https://www.google.com/',
+    'Sec-GPC' : '1',
+    'DNT' : '1',
+}
+
+
+def compile_simple_selector(selector):
+    """
+    Turns a simple selector such as ``.class``, ``#id``, ``tag``,
+    ``[attr='value']``, ``tag[attr='value']`` or ``tag[attr*='value']`` into a
+    ``(tag, attribute, operator, value)`` tuple that can be checked on a single
+    tag. Missing parts are None.
+    """
+    if selector.startswith("."):
+        return None, "class", "~=", selector[1:]
+    if selector.startswith("#"):
+        return None, "id", "=", selector[1:]
+    if "[" not in selector:
+        return selector, None, None, None
+    if not selector.endswith("]"):
+        raise ValueError(f"Unsupported selector: {selector}")
+    tag_name, condition = selector[:-1].split("[", 1)
+    for operator in ("*=", "="):
+        if operator in condition:
+            attribute, value = condition.split(operator, 1)
+            return tag_name or None, attribute.strip(), operator, value.strip().strip("'\"")
+    raise ValueError(f"Unsupported selector: {selector}")
+
+
+POPUP_SELECTOR_CHECKS = [(selector, *compile_simple_selector(selector)) for selector in POPUP_CSS_SELECTORS]
+INTERACTIVE_SELECTOR_CHECKS = [(selector, *compile_simple_selector(selector)) for selector in INTERACTIVE_SELECTORS]
+
+
+def matches_simple_selector(tag, tag_name, attribute, operator, value):
+    if tag_name is not None and tag.name != tag_name:
+        return False
+    if attribute is None:
+        return True
+    attribute_value = tag.attrs.get(attribute)
+    if attribute_value is None:
+        return False
+    if isinstance(attribute_value, list):  # multi-valued attributes such as class
+        if operator == "~=":
+            return value in attribute_value
+        attribute_value = " ".join(attribute_value)
+    if operator == "*=":
+        return value in attribute_value
+    return attribute_value == value
+
+
+def element_path(tag):
+    """Returns a CSS-like path such as ``html > body > div#cookie.banner``."""
+    parts = []
+    while tag is not None and tag.name != "[document]":
+        part = tag.name
+        if tag.get("id"):
+            part += f"#{tag['id']}"
+        classes = tag.get("class")
+        if classes:
+            part += "".join(f".{name}" for name in classes)
+        parts.append(part)
+        tag = tag.parent
+    return " > ".join(reversed(parts))
+
+
+def analyze_html(html):
+    """
+    Runs the pop-up, ARIA-role and human-interaction checks in one walk over
+    one parse of a page.
+
+    Each text node is stripped once. It is scanned by POPUP_AUTOMATON when it
+    sits inside a POPUP_CONTAINER_TAGS element and appended to the text of any
+    open element whose text a check needs (pop-up selectors, ARIA roles,
+    interactive selectors), so no element text is ever rebuilt from its
+    descendants.
 
-def check_for_popups(url):
+    Args:
+        html (str, bytes or BeautifulSoup): The page to inspect.
+
+    Returns:
+        dict: ``popups``, ``roles`` and ``interaction`` lists, each holding one
+              dictionary per finding in document order.
+    """
+    if isinstance(html, (bytes, bytearray, memoryview)):
+        # decoding up front spares BeautifulSoup its own, much slower, encoding detection
+        html = decode_html(html)
+    soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, 'html.parser')
+    report = {"popups": [], "roles": [], "interaction": []}
+    paths = {}
+    # (findings waiting for the element text, collected text pieces) per open element
+    collectors = []
+
+    def path_of(tag):
+        if id(tag) not in paths:
+            paths[id(tag)] = element_path(tag)
+        return paths[id(tag)]
+
+    stack = [(soup, None, False)]
+    while stack:
+        node, container, closing = stack.pop()
+        if closing:
+            findings, pieces = collectors.pop()
+            text = " ".join(pieces)
+            for kind, finding in findings:
+                if kind == "interaction":
+                    keywords = sorted({keyword for _, keyword in INTERACTION_AUTOMATON.iter_matches(text)})
+                    if not keywords:
+                        continue
+                    finding["keywords"] = keywords
+                    finding["text"] = text
+                elif kind == "popups":
+                    finding["text"] = text[:80]
+                else:
+                    finding["text"] = text
+                report[kind].append(finding)
+            continue
+
+        if isinstance(node, Tag):
+            if node.name in SKIPPED_TAGS:
+                continue
+            findings = []
+            for selector, *check in POPUP_SELECTOR_CHECKS:
+                if matches_simple_selector(node, *check):
+                    findings.append(("popups", {"type": "selector", "selector": selector, "tag": node.name, "path": path_of(node)}))
+            role = node.get("role")
+            if role in ARIA_ROLES:
+                findings.append(("roles", {"role": role, "tag": node.name, "path": path_of(node)}))
+            for selector, *check in INTERACTIVE_SELECTOR_CHECKS:
+                if matches_simple_selector(node, *check):
+                    findings.append(("interaction", {"selector": selector, "tag": node.name, "path": path_of(node)}))
+                    break
+
+            if node.name in POPUP_CONTAINER_TAGS:
+                container = node
+            if findings:
+                labels = [str(node[name]) for name in LABEL_ATTRIBUTES if node.get(name)]
+                collectors.append((findings, labels))
+                stack.append((node, container, True))
+            # reversed so that nodes come off the stack in document order
+            stack.extend((child, container, False) for child in reversed(node.contents))
+        elif type(node) in (NavigableString, CData):
+            text = node.strip()
+            if not text:
+                continue
+            for _, pieces in collectors:
+                pieces.append(text)
+            if container is None:
+                continue
+            for offset, keyword in POPUP_AUTOMATON.iter_matches(text):
+                report["popups"].append({
+                    "type": "keyword",
+                    "keyword": keyword,
+                    "tag": container.name,
+                    "path": path_of(container),
+                    "text": text,
+                    "offset": offset,
+                })
+    return report
+
+
+def detect_popup_indicators(html):
+    """
+    Finds every pop-up indicator in a page with a single walk over the DOM.
+
+    Each text node is stripped and lowercased once and scanned by
+    POPUP_AUTOMATON for all keywords at the same time, so the cost is linear in
+    the size of the document instead of growing with nesting depth and the
+    number of keywords. Pop-up classes, IDs and attributes are checked on
+    each tag during the same walk.
+
+    Args:
+        html (str, bytes or BeautifulSoup): The page to inspect.
+
+    Returns:
+        list: One dictionary per indicator. Keyword hits have ``type``
+              "keyword", the ``keyword``, the enclosing container ``tag`` and
+              its ``path``, the text node and the ``offset`` of the keyword in
+              it. Selector hits have ``type`` "selector", the ``selector``,
+              ``tag``, ``path`` and the start of the element text.
+    """
+    return analyze_html(html)["popups"]
+
+
+# Elements that never get a closing tag
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+
+class StartTag:
+    """Minimal tag view so matches_simple_selector can be used on parser events."""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = {key: value or "" for key, value in attrs}
+        if "class" in self.attrs:
+            self.attrs["class"] = self.attrs["class"].split()
+
+    def label(self):
+        label = self.name
+        if self.attrs.get("id"):
+            label += f"#{self.attrs['id']}"
+        label += "".join(f".{name}" for name in self.attrs.get("class", []))
+        return label
+
+
+class IncrementalPopupScanner(HTMLParser):
+    """
+    Event-based pop-up detector that is fed the page chunk by chunk.
+
+    It applies the same keyword and selector checks as detect_popup_indicators,
+    but needs no tree: open elements are kept on a stack and text is scanned as
+    it arrives. ``decided`` becomes True once ``min_indicators`` indicators
+    were seen, at which point the caller can stop reading.
+    """
+
+    def __init__(self, min_indicators=1):
+        super().__init__(convert_charrefs=True)
+        self.min_indicators = min_indicators
+        self.indicators = []
+        self._stack = []
+        self._containers = 0
+        self._skipped = 0
+        self._text = []
+
+    @property
+    def decided(self):
+        return len(self.indicators) >= self.min_indicators
+
+    def _path(self):
+        return " > ".join(tag.label() for tag in self._stack)
+
+    def _flush_text(self):
+        # text can arrive in several handle_data calls when it spans chunks
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if not text or not self._containers or self._skipped:
+            return
+        container = next(tag for tag in reversed(self._stack) if tag.name in POPUP_CONTAINER_TAGS)
+        for offset, keyword in POPUP_AUTOMATON.iter_matches(text):
+            self.indicators.append({
+                "type": "keyword",
+                "keyword": keyword,
+                "tag": container.name,
+                "path": self._path(),
+                "text": text,
+                "offset": offset,
+            })
+
+    def handle_starttag(self, name, attrs):
+        self._flush_text()
+        tag = StartTag(name, attrs)
+        if not self._skipped:
+            for selector, *check in POPUP_SELECTOR_CHECKS:
+                if matches_simple_selector(tag, *check):
+                    path = " > ".join([self._path(), tag.label()]) if self._stack else tag.label()
+                    self.indicators.append({"type": "selector", "selector": selector, "tag": name, "path": path})
+        if name in VOID_ELEMENTS:
+            return
+        self._stack.append(tag)
+        self._containers += name in POPUP_CONTAINER_TAGS
+        self._skipped += name in SKIPPED_TAGS
+
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs)
+        if name not in VOID_ELEMENTS:
+            self.handle_endtag(name)
+
+    def handle_endtag(self, name):
+        self._flush_text()
+        if not any(tag.name == name for tag in self._stack):
+            return  # stray closing tag
+        while self._stack:
+            tag = self._stack.pop()
+            self._containers -= tag.name in POPUP_CONTAINER_TAGS
+            self._skipped -= tag.name in SKIPPED_TAGS
+            if tag.name == name:
+                break
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+
+def scan_popups_incremental(chunks, encoding=None, max_bytes=512 * 1024, min_indicators=1, content_type=None):
+    """
+    Feeds byte chunks to an IncrementalPopupScanner until a decision is
+    reached, the byte cap is hit or the input ends.
+
+    Args:
+        chunks (iterable): Raw page bytes, e.g. ``response.iter_content()``.
+        encoding (str, optional): Character encoding of the page. Detected
+            from ``content_type`` and the first chunk when not given.
+        max_bytes (int): Maximum number of bytes to read.
+        min_indicators (int): Number of indicators that settles the decision.
+        content_type (str, optional): Value of the HTTP Content-Type header.
+
+    Returns:
+        dict: ``has_popups``, the ``indicators`` found, ``bytes_read`` and
+              ``stopped_early`` (True when the rest of the input was not read).
+    """
+    scanner = IncrementalPopupScanner(min_indicators)
+    decoder = None
+    bytes_read = 0
+    stopped_early = False
+    for chunk in chunks:
+        if decoder is None:
+            encoding = encoding or detect_encoding(chunk, content_type)[0]
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        if bytes_read >= max_bytes:
+            stopped_early = True
+            break
+        chunk = chunk[:max_bytes - bytes_read]
+        bytes_read += len(chunk)
+        scanner.feed(decoder.decode(chunk))
+        if scanner.decided:
+            stopped_early = True
+            break
+    if not scanner.decided:
+        # text still buffered at the byte cap or the end of the input is scanned too
+        if decoder is not None:
+            scanner.feed(decoder.decode(b"", final=True))
+        scanner.close()
+    return {
+        "has_popups": bool(scanner.indicators),
+        "indicators": scanner.indicators,
+        "bytes_read": bytes_read,
+        "stopped_early": stopped_early,
+    }
+
+
+def check_for_popups_streaming(url, max_bytes=512 * 1024, min_indicators=1, chunk_size=16 * 1024):
+    """
+    Streams a page and stops downloading and parsing as soon as the pop-up
+    decision is reached or ``max_bytes`` were read.
+
+    Args:
+        url (str): The URL of the webpage to scan.
+        max_bytes (int): Maximum number of body bytes to download.
+        min_indicators (int): Number of indicators that settles the decision.
+        chunk_size (int): Size of the chunks read from the connection.
+
+    Returns:
+        dict: The scan result of scan_popups_incremental plus the ``url``.
+    """
+    with requests.get(url, headers=BROWSER_HEADERS, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        result = scan_popups_incremental(
+            response.iter_content(chunk_size=chunk_size), None, max_bytes, min_indicators,
+            response.headers.get("Content-Type"),
+        )
+    # leaving the with block closes the connection, dropping any unread body
+    result["url"] = url
+    return result
+
+
+def check_for_popups(url, incremental=False):
     """
     Scrapes a webpage and checks for potential pop-ups related to terms,
     content warnings, or subscription requests.
 
     Args:
         url (str): The URL of the webpage to scrape.
+        incremental (bool): Stream the page and stop at the first indicator
+            instead of downloading and parsing all of it.
 
     Returns:
         bool: True if any potential pop-up indicators are found, False otherwise.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Common keywords and phrases associated with pop-ups
-        popup_keywords = [
-            "terms",
-            "terms of service",
-            "privacy policy",
-            "content warning",
-            "mature content",
-            "subscribe",
-            "subscription",
-            "premium",
-            "sign up",
-            "register",
-            "agree",
-            "accept",
-            "continue",
-            "confirm",
-            "verify your age",
-            "age verification",
-            "access content",
-            "unlock content",
-            "get full access",
-            "limited access",
-            "cookies"
-        ]
-
-        # Check for these keywords in text content of specific elements
-        elements_to_check = ['div', 'section', 'article', 'aside', 'main', 'footer', 'form', 'dialog']
-
-        for element_type in elements_to_check:
-            elements = soup.find_all(element_type)
-            for element in elements:
-                text_content = element.get_text(strip=True).lower()
-                for keyword in popup_keywords:
-                    if keyword in text_content:
-                        print(f"Potential pop-up indicator found in <{element_type}> tag: '{keyword}'")
-                        return True
-
-        # Check for specific CSS classes or IDs that are often used for pop-ups
-        popup_css_selectors = [
-            ".popup",
-            ".modal",
-            ".overlay",
-            "#popup-container",
-            "#modal-window",
-            "#overlay-background",
-            "[role='dialog']",
-            "[aria-modal='true']",
-        ]
-
-        for selector in popup_css_selectors:
-            popup_elements = soup.select(selector)
-            if popup_elements:
-                first_element = popup_elements[0]
-                element_text = first_element.get_text(strip=True).lower()
-                # for keyword in popup_keywords:
-                #     if keyword in element_text:
-                #         tag_name = first_element.name
-                print(f"Potential pop-up element found with CSS selector: '{selector}' (in <{first_element.name}> tag) containing keyword: '{element_text}'")
-                return True
+        if incremental:
+            indicators = check_for_popups_streaming(url)["indicators"]
+        else:
+            response = requests.get(url)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            indicators = detect_popup_indicators(decode_response(response))
 
-        return False
+        for indicator in indicators:
+            if indicator["type"] == "keyword":
+                print(f"Potential pop-up indicator found in <{indicator['tag']}> tag ({indicator['path']}): '{indicator['keyword']}'")
+            else:
+                print(f"Potential pop-up element found with CSS selector: '{indicator['selector']}' (in <{indicator['tag']}> tag) containing: '{indicator['text']}'")
+
+        return bool(indicators)
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching URL: {e}")
@@ -86,67 +521,30 @@ def check_for_popups(url):
         print(f"An error occurred during parsing: {e}")
         return False
 
-def find_elements_with_roles(html_content):
+def find_elements_with_roles(url):
     """
-    Loads HTML content using BeautifulSoup, finds elements with specific roles,
-    and returns the text associated with those elements.
+    Fetches a page, finds elements with specific ARIA roles, and returns the
+    text associated with those elements.
 
     Args:
-        html_content (str): The HTML content of the page as a string.
+        url (str): The URL of the webpage to scrape.
 
     Returns:
         list: A list of dictionaries, where each dictionary contains
               the role and the text content of the found element.
     """
-    header = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Cache-Control': 'max-age=0',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-        'Pragma': 'no-cache',
-        # Add more Sec-Ch-Ua related headers for a more modern Chrome-like feel
-        'Sec-Ch-Ua': '"Not A(Brand";v="99", "Google Chrome";v="120", "Chromium";v="120"',
-        'Sec-Ch-Ua-Platform': '"Windows"',  # Or "macOS", "Linux", etc.
-        'Sec-Ch-Ua-Mobile': '?0',
-        'Referer': 'https://www.google.com/',
-        'Sec-GPC' : '1',
-        'DNT' : '1',
-
-    }
-    response = requests.get(url, stream=True, headers=header)
+    response = requests.get(url, headers=BROWSER_HEADERS)
     response.raise_for_status()  # Raise an exception for bad status codes
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-
-
-    # While the prompt mentions "decompose content", it's unclear what exactly
-    # should be decomposed before finding elements. If the intention was to
-    # remove certain parts of the HTML before searching, that logic would be
-    # added here. For now, we'll proceed with the entire parsed soup.
-
-    found_elements = []
-    roles_to_find = ["alertdialog", "alert", "button"]
-
-    for element in soup(["script", "style"]):
-        element.decompose()
-
-    for role in roles_to_find:
-        elements = soup.find_all(attrs={"role": role})
-        for element in elements:
-            found_elements.append({"role": role, "text": element.text.strip()})
+    found_elements = [
+        {"role": finding["role"], "text": finding["text"]}
+        for finding in analyze_html(decode_response(response))["roles"]
+    ]
     print(found_elements)
-    return False
-    
-.  `def check_for_human_interaction(url):
+    return found_elements
+
 
-\2   """
+def check_for_human_interaction(url):
+    """
     Scrapes a webpage and checks for potential indicators that human interaction
     might be required to access the content (e.g., login forms, age verification).
 
@@ -159,70 +557,10 @@ def find_elements_with_roles(html_content):
     try:
         response = requests.get(url)
         response.raise_for_status()  # Raise an exception for bad status codes
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Keywords and phrases suggesting human interaction
-        interaction_keywords = [
-            "login",
-            "sign in",
-            "log in",
-            "username",
-            "password",
-            "email",
-            "enter your email",
-            "age verification",
-            "verify your age",
-            "are you 18 or older?",
-            "date of birth",
-            "captcha",
-            "i'm not a robot",
-            "create account",
-            "register",
-            "subscription required",
-            "paywall",
---
-
-            "unlock premium content",
- vcxz            "enter your details",
-            "submit",
-            "continue",
-            "accept terms",
-            "agree to terms",
-        ]
-
-        # CSS selectors for common interactive elements
-        interactive_selectors = [
-            # "form",  # Look for forms (often login/registration)
-            "input[type='password']",
-            "input[type='email']",
-            "input[type='text']",
-            "button[type='submit']",
-            "a[href*='login']",
-            "a[href*='signup']",
-            "div[role='dialog']",  # Dialog boxes can require interaction
-            "iframe", # Can sometimes contain interactive elements
-        ]
-
-        # Check for keywords in the text content of the page
-        # page_text = soup.get_text(strip=True).lower()
-        # for keyword in interaction_keywords:
-        #     if keyword in page_text:
-        #         print(f"Potential human interaction indicator found in page text: '{keyword}'")
-        #         return True
-
-        # Check for specific interactive elements using CSS selectors
-        for selector in interactive_selectors:
-            elements = soup.select(selector)
-            if elements:
-                for element in elements:
-                    if any(keyword in element.get_text(strip=True).lower() for keyword in interaction_keywords):
-                        tag_name = element.name
-                        print(f"Potential human interaction element found with CSS selector: '{selector}' (in <{tag_name}> tag) containing keyword: '{element.get_text(strip=True).lower()}'")
-                        # return True
-                # print(f"Potential human interaction element found with CSS selector: '{selector}' - {elements[0] }")
-                # return True
-
-        return False
+        findings = analyze_html(decode_response(response))["interaction"]
+        for finding in findings:
+            print(f"Potential human interaction element found with CSS selector: '{finding['selector']}' (in <{finding['tag']}> tag) containing keyword: '{finding['text'].lower()}'")
+        return bool(findings)
 
     except requests.exceptions.RequestException as e:
         print(f"Error fetching URL: {e}")
@@ -232,6 +570,89 @@ def find_elements_with_roles(html_content):
         return False
 
 
+def fetch_page(session, url, timeout=30):
+    """
+    Downloads one page for the batch analyzer.
+
+    Returns:
+        dict: ``url``, ``status``, ``content`` (bytes or None), ``error`` and
+              ``fetch_seconds``.
+    """
+    started = time.perf_counter()
+    try:
+        response = session.get(url, headers=BROWSER_HEADERS, timeout=timeout)
+        response.raise_for_status()
+        return {"url": url, "status": response.status_code, "content": response.content,
+                "content_type": response.headers.get("Content-Type"),
+                "error": None, "fetch_seconds": time.perf_counter() - started}
+    except requests.exceptions.RequestException as e:
+        status = e.response.status_code if e.response is not None else None
+        return {"url": url, "status": status, "content": None,
+                "error": str(e), "fetch_seconds": time.perf_counter() - started}
+
+
+def build_report(fetched, analysis=None, parse_seconds=None, error=None):
+    """Combines a fetch result and its analysis into the per-URL report."""
+    analysis = analysis or {"popups": [], "roles": [], "interaction": []}
+    return {
+        "url": fetched["url"],
+        "status": fetched["status"],
+        "error": error or fetched["error"],
+        "fetch_seconds": fetched["fetch_seconds"],
+        "parse_seconds": parse_seconds,
+        "has_popups": bool(analysis["popups"]),
+        "requires_interaction": bool(analysis["interaction"]),
+        **analysis,
+    }
+
+
+def timed_analyze_html(content, content_type=None):
+    """Process-pool entry point returning the analysis and how long it took."""
+    started = time.perf_counter()
+    analysis = analyze_html(decode_html(content, content_type))
+    return analysis, time.perf_counter() - started
+
+
+def analyze_urls(urls, fetch_threads=16, parse_processes=None):
+    """
+    Analyzes a batch of pages: each URL is fetched once by a thread pool and
+    its HTML is parsed once, in a process pool, by analyze_html. Parsing starts
+    as soon as a page arrives, so network waits and CPU work overlap.
+
+    Args:
+        urls (list): Pages to analyze.
+        fetch_threads (int): Number of concurrent downloads.
+        parse_processes (int, optional): Size of the parsing process pool.
+            Defaults to the number of CPUs.
+
+    Returns:
+        list: One report dictionary per URL, in the order of ``urls``.
+    """
+    reports = {}
+    adapter = requests.adapters.HTTPAdapter(pool_connections=fetch_threads, pool_maxsize=fetch_threads)
+    with requests.Session() as session, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=fetch_threads) as fetch_pool, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=parse_processes or cpu_count()) as parse_pool:
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        fetches = {fetch_pool.submit(fetch_page, session, url): index for index, url in enumerate(urls)}
+        parses = {}
+        for future in concurrent.futures.as_completed(fetches):
+            index, fetched = fetches[future], future.result()
+            if fetched["content"] is None:
+                reports[index] = build_report(fetched)
+                continue
+            parses[parse_pool.submit(timed_analyze_html, fetched["content"], fetched["content_type"])] = (index, fetched)
+        for future in concurrent.futures.as_completed(parses):
+            index, fetched = parses[future]
+            try:
+                analysis, parse_seconds = future.result()
+                reports[index] = build_report(fetched, analysis, parse_seconds)
+            except Exception as e:
+                reports[index] = build_report(fetched, error=f"An error occurred during parsing: {e}")
+    return [reports[index] for index in range(len(urls))]
+
+
 if __name__ == "__main__":
 
     url_list = [
@@ -248,12 +669,15 @@ if __name__ == "__main__":
         "https://www.abcnews.com/",
     ]
 
-    for url in url_list:
-        # has_popups = check_for_popups(url)
-        print(f"Checking the page at {url}...")
-        # requires_interaction = check_for_human_interaction(url)
-        dialog = find_elements_with_roles(url)
-        # if has_popups:
-        #     print(f"The page at {url} likely contains pop-ups related to terms, content warnings, or subscriptions.")
-        # if requires_interaction:
-        #     print(f"The page at {url} likely requires human interaction to access the content.")
\ No newline at end of file
+    for report in analyze_urls(url_list):
+        print(f"Checking the page at {report['url']}...")
+        if report["error"]:
+            print(f"  Error: {report['error']}")
+            continue
+        print(json.dumps({key: report[key] for key in ("status", "fetch_seconds", "parse_seconds", "has_popups", "requires_interaction")}))
+        if report["has_popups"]:
+            print(f"The page at {report['url']} likely contains pop-ups related to terms, content warnings, or subscriptions.")
+        if report["requires_interaction"]:
+            print(f"The page at {report['url']} likely requires human interaction to access the content.")
+        if report["roles"]:
+            print(f"  ARIA roles: {[(finding['role'], finding['text'][:40]) for finding in report['roles']]}")
@@ -1,43 +1,210 @@
-import io
-import gzip
+import concurrent.futures
+import itertools
+import logging
+import zlib
+from collections import defaultdict, deque
+from multiprocessing import cpu_count
+from urllib.parse import urlparse
+
+import pandas as pd
 import requests
-from comcrawl.utils import make_multithreaded
-from comcrawl import IndexClient
+import requests.adapters
+from bs4 import BeautifulSoup
+
+import cdx_cache
+from warc_records import parse_record
+from warc_store import DEFAULT_STORE_DIR, WarcRecordStore, record_key
 URL_TEMPLATE = "https://data.commoncrawl.org/{filename}"
 
-def download_single_result(result):
+# Unrequested bytes we accept downloading between two records to save a request
+MAX_RANGE_GAP = 64 * 1024
+# Upper bound for a single coalesced range request
+MAX_RANGE_SPAN = 16 * 1024 * 1024
+
+
+def create_session(pool_size=16):
+    """Creates a session with pooled keep-alive connections to data.commoncrawl.org."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def plan_byte_ranges(results, max_gap=MAX_RANGE_GAP, max_span=MAX_RANGE_SPAN):
+    """Groups search results into coalesced byte ranges.
+
+    Results are grouped by WARC ``filename`` and sorted by offset. Neighbouring
+    records are merged into one range while the gap between them is at most
+    ``max_gap`` bytes and the whole range stays within ``max_span`` bytes.
+
+    Args:
+        results: Common Crawl Index search results.
+        max_gap: Largest gap between two records that is still bridged.
+        max_span: Largest size of a merged range.
+    Returns:
+        List of ranges, each a dict with ``filename``, ``start``, ``end``
+        (exclusive) and the ``members`` it covers.
+
+    """
+    by_filename = defaultdict(list)
+    for result in results:
+        by_filename[result["filename"]].append(result)
+
+    ranges = []
+    for filename, members in by_filename.items():
+        members.sort(key=lambda result: int(result["offset"]))
+        current = None
+        for result in members:
+            start = int(result["offset"])
+            end = start + int(result["length"])
+            if (current is not None
+                    and start - current["end"] <= max_gap
+                    and max(end, current["end"]) - current["start"] <= max_span):
+                current["end"] = max(end, current["end"])
+                current["members"].append(result)
+            else:
+                current = {"filename": filename, "start": start, "end": end, "members": [result]}
+                ranges.append(current)
+    return ranges
+
+
+def fetch_byte_range(byte_range, session):
+    """Downloads one coalesced range and slices out its records.
+
+    Args:
+        byte_range: A range produced by plan_byte_ranges.
+        session: requests session used for the download.
+    Returns:
+        List of ``(result, raw_record)`` pairs, where ``raw_record`` is a
+        zero-copy view of the record's gzip member.
+
+    """
+    start, end = byte_range["start"], byte_range["end"]
+    url = URL_TEMPLATE.format(filename=byte_range["filename"])
+    response = session.get(url, headers={"Range": f"bytes={start}-{end - 1}"}, timeout=60)
+    response.raise_for_status()
+    data = memoryview(response.content)
+    if response.status_code == 200:
+        # the server ignored the Range header and sent the whole file
+        data = data[start:end]
+
+    records = []
+    for result in byte_range["members"]:
+        offset = int(result["offset"]) - start
+        records.append((result, data[offset:offset + int(result["length"])]))
+    return records
+
+
+def fetch_records(results, session=None, threads=8, max_gap=MAX_RANGE_GAP, max_span=MAX_RANGE_SPAN,
+                  max_pending=None, store=None):
+    """Downloads the raw WARC records of many search results with as few
+    range requests as possible.
+
+    Args:
+        results: Common Crawl Index search results.
+        session: Optional requests session, a pooled one is created if missing.
+        threads: Number of ranges downloaded in parallel.
+        max_gap: See plan_byte_ranges.
+        max_span: See plan_byte_ranges.
+        max_pending: Most ranges downloaded or waiting to be consumed at
+            once. Defaults to twice the number of threads, so a slow consumer
+            holds back the downloads instead of buffering every record.
+        store: Optional WarcRecordStore. Records found in it are not
+            downloaded, downloaded records are added to it.
+    Yields:
+        ``(index, result, raw_record)`` triples as their ranges arrive, where
+        ``index`` is the position of the result in ``results``. Stored records
+        come first. ``raw_record`` is None for results whose range could not be
+        downloaded, so every result is yielded exactly once.
+
+    """
+    results = list(results)
+    # the planner regroups the results, their input positions are looked up by identity
+    positions = defaultdict(deque)
+    missing = []
+    for index, result in enumerate(results):
+        raw_record = store.get(record_key(result)) if store is not None else None
+        if raw_record is None:
+            positions[id(result)].append(index)
+            missing.append(result)
+        else:
+            yield index, result, raw_record
+    results = missing
+
+    threads = max(threads, 1)
+    max_pending = max(max_pending or 2 * threads, 1)
+    ranges = iter(plan_byte_ranges(results, max_gap, max_span))
+    own_session = session is None
+    session = session or create_session(pool_size=threads)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            pending = set()
+            submitted = {}
+            while True:
+                for byte_range in itertools.islice(ranges, max_pending - len(pending)):
+                    future = executor.submit(fetch_byte_range, byte_range, session)
+                    submitted[future] = byte_range
+                    pending.add(future)
+                if not pending:
+                    break
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    byte_range = submitted.pop(future)
+                    try:
+                        records = future.result()
+                    except requests.exceptions.RequestException as e:
+                        logging.warning(
+                            f"Could not download bytes {byte_range['start']}-{byte_range['end'] - 1} of "
+                            f"{byte_range['filename']} ({len(byte_range['members'])} records): {e}"
+                        )
+                        records = [(result, None) for result in byte_range["members"]]
+                    for result, raw_record in records:
+                        if raw_record is not None and store is not None and not store.read_only:
+                            key = record_key(result)
+                            try:
+                                store.put(key, raw_record)
+                            except ValueError as e:
+                                # e.g. a truncated range response, the record is still handed on unstored
+                                logging.warning(f"Not storing record {key}: {e}")
+                        yield positions[id(result)].popleft(), result, raw_record
+    finally:
+        if own_session:
+            session.close()
+
+def download_single_result(result, session=None):
     """Downloads HTML for single search result.
     Args:
         result: Common Crawl Index search result from the search function.
+        session: Optional requests session to reuse connections.
     Returns:
         The provided result, extendey by the corresponding HTML String.
 
     """
-    offset, length = int(result["offset"]), int(result["length"])
-
-    offset_end = offset + length - 1
+    byte_range = plan_byte_ranges([result])[0]
+    (result, raw_record), = fetch_byte_range(byte_range, session or requests)
+    return extract_result(result, raw_record)
 
-    url = URL_TEMPLATE.format(filename=result["filename"])
-    response = (requests
-                .get(
-                    url,
-                    headers={"Range": f"bytes={offset}-{offset_end}"}
-                ))
 
-    zipped_file = io.BytesIO(response.content)
-    # print(response.content)
-    unzipped_file = gzip.GzipFile(fileobj=zipped_file)
+def extract_result(result, raw_record):
+    """Extracts the page text and metadata of a downloaded WARC record.
+    Args:
+        result: Common Crawl Index search result.
+        raw_record: The gzip member holding the record, or the record
+            already decompressed.
+    Returns:
+        The provided result, extended by the parsed HTML text and metadata.
 
-    raw_data: bytes = unzipped_file.read()
+    """
+    url = URL_TEMPLATE.format(filename=result["filename"])
     try:
-        data: str = raw_data.decode("utf-8")
-    except UnicodeDecodeError:
-        print(f"Warning: Could not extract file downloaded from {url}")
-        data = ""
-
-    if len(data) > 0:
-        data_parts = data.strip().split("\r\n\r\n", 2)
-        html_content = data_parts[2] if len(data_parts) == 3 else ""
+        record = parse_record(raw_record)
+    except (OSError, EOFError, ValueError, zlib.error) as e:
+        print(f"Warning: Could not extract file downloaded from {url}: {e}")
+        return result
+
+    if len(record.payload) > 0:
+        html_content = record.text()
         soup = BeautifulSoup(html_content, 'html.parser')  
         # Remove script and style elements  
         for element in soup(['script', 'style']):  
@@ -52,7 +219,7 @@ def download_single_result(result):
         # Combine the lines into a single string  
         html_content = '\n'.join(line for line in lines if line)  
         result["html_parsed"] = html_content
-        title = soup.title.text
+        title = soup.title.get_text() if soup.title else ""
         parsed_url = urlparse(result["url"])
         if parsed_url.path == "/":
             title = f"Home Page of the company | {title}"
@@ -62,52 +229,83 @@ def download_single_result(result):
         except TypeError:
             result["url_metadata"] = title
     return result
-def download_multiple_results(results, threads = 8):
+def download_multiple_results(results, threads = 8, processes = None, max_pending = None, store = None):
     """Downloads search results.
 
     For each Common Crawl search result in the given list the
-    corresponding HTML page is downloaded.
+    corresponding HTML page is downloaded. Records stored close to each
+    other in the same WARC file are fetched with a single range request
+    over pooled keep-alive connections.
+
+    Fetching and extraction are separate stages: the download threads only
+    do network I/O, while decompression and HTML parsing run in a process
+    pool, so neither stage is held back by the GIL of the other. At most
+    ``max_pending`` records wait for extraction, and downloads pause while
+    that queue is full.
     Args:
         results: List of Common Crawl search results.
         threads: Number of threads to use for faster parallel downloads on
             multiple threads.
+        processes: Size of the extraction process pool, defaults to the
+            number of CPUs. With 0 the records are extracted in this process.
+        max_pending: Most records queued for extraction, defaults to four
+            per process.
+        store: Optional WarcRecordStore serving records fetched before.
     Returns:
-        The provided results list, extended by the corresponding
-        HTML strings.
+        The provided results list, in input order, extended by the
+        corresponding HTML strings. Results whose record could not be
+        downloaded or parsed are returned without ``html_parsed``; failed
+        downloads are logged.
 
     """
-    results_with_html = []
-    if threads:
-        multithreaded_download = make_multithreaded(download_single_result,
-                                                    threads)
-        results_with_html = multithreaded_download(results)
+    results = list(results)
+    # records arrive in completion order, each result goes back to its input position
+    results_with_html = [None] * len(results)
+    records = fetch_records(results, threads=threads or 1, store=store)
+    if processes == 0:
+        for index, result, raw_record in records:
+            results_with_html[index] = result
+            if raw_record is not None:
+                try:
+                    results_with_html[index] = extract_result(result, raw_record)
+                except Exception as e:
+                    logging.error(f"Could not extract {result.get('url')}: {e}")
+        return results_with_html
 
-    else:
-        for result in results:
-            result_with_html = download_single_result(result)
-            results_with_html.append(result_with_html)
+    processes = processes or cpu_count()
+    max_pending = max(max_pending or 4 * processes, 1)
+    def collect(future, index, result):
+        # a failed extraction keeps the plain result, like a failed download
+        try:
+            results_with_html[index] = future.result()
+        except Exception as e:
+            logging.error(f"Could not extract {result.get('url')}: {e}")
+            results_with_html[index] = result
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = {}
+        for index, result, raw_record in records:
+            if raw_record is None:
+                results_with_html[index] = result
+                continue
+            if len(pending) >= max_pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    collect(future, *pending.pop(future))
+            # memoryviews cannot be pickled, the record is copied once for the worker
+            pending[executor.submit(extract_result, result, bytes(raw_record))] = (index, result)
+        for future in concurrent.futures.as_completed(pending):
+            collect(future, *pending[future])
 
     return results_with_html
 
 if __name__ == "__main__": 
 
-    client = IndexClient(["2023-23", "2023-14","2023-06","2022-49","2022-40", "2022-33", "2022-27", "2022-21", "2022-05", "2021-49", "2021-43", "2021-39", "2021-31", "2021-25", "2021-21", "2021-17", "2021-10", "2021-04"], verbose = False)
-    client.search("covanta.com/*", threads=10)
-    if len(client.results) > 0:
-        first_page_html = client.results[0]["url"]
-        print(first_page_html)
-        client.results = (pd.DataFrame(client.results)
-                        .sort_values(by="timestamp")
-                        .drop_duplicates("urlkey", keep="last")
-                        .to_dict("records"))
-        
-        result = pd.DataFrame(client.results)
-        print(result.columns.tolist())
-        result = result[(result["status"]=="200") & (result["mime"]=="text/html") & (result["languages"]=="eng") & (result["encoding"]=="UTF-8")]
-        print(f"Total Searched pages in Common Crawl resulted for the domain : {result.shape[0]} pages")
-
-    result["url_metadata"] = result.apply(lambda row: meta_information_pandas(row), axis = 1)
-    content_detailed = result[(result["url_metadata"]!="")]
-    content_detailed = download_multiple_results(content_detailed.to_dict('records'))
-    content_detailed = pd.DataFrame(content_detailed)
+    results = cdx_cache.search("covanta.com/*", cdx_cache.DEFAULT_INDEXES, cdx_cache.DEFAULT_FILTERS, threads=10)
+    print(f"Total Searched pages in Common Crawl resulted for the domain : {len(results)} pages")
+
+    with WarcRecordStore(DEFAULT_STORE_DIR, max_bytes=10 * 1024 ** 3) as store:
+        content_detailed = pd.DataFrame(download_multiple_results(results, store=store))
+    if not content_detailed.empty:
+        content_detailed = content_detailed[content_detailed["url_metadata"].fillna("") != ""]
     print(f"Result is filtered to contain only relevant pages: {content_detailed.shape[0]} pages")
@@ -0,0 +1,410 @@
+"""
+
+Offline throughput benchmark for PatternCrawler.
+
+A local HTTP server generates synthetic company websites (page count, link
+fan-out, page size, response latency and duplicate content are configurable).
+The crawler reaches the server as an HTTP proxy, so the start URLs keep real
+looking domain names that tldextract understands while no request leaves the
+machine. Every benchmark case runs in a fresh process, because a Twisted
+reactor cannot be restarted, and reports pages per second, bytes per second,
+peak RSS and reactor lag.
+
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from crawl_launcher import load_web_scraping
+from synthetic_latency import LATENCY_DISTRIBUTIONS, sample_latency
+
+FILLER_WORDS = (
+    "about contact features products services solutions industry customers "
+    "quality delivery engineering support partners company history mission "
+    "team careers news innovation sustainability manufacturing logistics"
+).split()
+
+
+class SyntheticSite:
+    """
+    Deterministic generator for the pages of one synthetic website.
+
+    Args:
+        host (str): Host name the site is served under.
+        pages (int): Number of distinct page URLs.
+        fanout (int): Number of links on each page.
+        page_bytes (int): Approximate size of each HTML page.
+        duplicate_ratio (float): Share of pages that repeat the home page body
+            under a different URL.
+        seed (int): Seed making the generated content reproducible.
+    """
+
+    def __init__(self, host, pages=200, fanout=10, page_bytes=20_000, duplicate_ratio=0.0, seed=0):
+        self.host = host
+        self.pages = pages
+        self.fanout = fanout
+        self.page_bytes = page_bytes
+        self.duplicate_ratio = duplicate_ratio
+        self.seed = seed
+
+    def links(self, page_id):
+        # Section-like paths so the link depth matches real company sites
+        sections = ("about", "products", "services", "contact", "news")
+        targets = [(page_id * self.fanout + k + 1) % self.pages for k in range(self.fanout)]
+        return [f"/{sections[target % len(sections)]}/page-{target}" for target in targets]
+
+    def is_duplicate(self, page_id):
+        rng = random.Random(f"{self.seed}-{self.host}-dup-{page_id}")
+        return page_id != 0 and rng.random() < self.duplicate_ratio
+
+    def render(self, page_id):
+        """Returns the HTML of a page as bytes."""
+        content_id = 0 if self.is_duplicate(page_id) else page_id
+        rng = random.Random(f"{self.seed}-{self.host}-{content_id}")
+        links = "".join(f'<li><a href="{href}">{href}</a></li>' for href in self.links(page_id))
+        paragraphs = []
+        size = 0
+        while size < self.page_bytes:
+            paragraph = "<p>" + " ".join(rng.choice(FILLER_WORDS) for _ in range(60)) + "</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        html = (
+            f"<html><head><title>{self.host} page {content_id}</title></head>"
+            f"<body><nav><ul>{links}</ul></nav><main>{''.join(paragraphs)}</main></body></html>"
+        )
+        return html.encode("utf-8")
+
+
+class SyntheticSiteServer:
+    """
+    Threaded HTTP server answering for every synthetic site.
+
+    Requests arrive either as proxy requests with an absolute URL or as plain
+    requests with a Host header; both are routed to the matching site.
+    """
+
+    def __init__(self, sites, latency_ms=50, latency_distribution="lognormal", seed=0):
+        self.sites = {site.host: site for site in sites}
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pages_served = 0
+        self.bytes_served = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_urls(self):
+        return [f"http://{host}/" for host in self.sites]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, request):
+        parts = urlsplit(request.path)
+        host = (parts.hostname or request.headers.get("Host", "")).split(":")[0]
+        site = self.sites.get(host)
+        page_id = self._page_id(parts.path)
+        with self.lock:
+            delay = sample_latency(self.rng, self.latency_distribution, self.latency_ms)
+        time.sleep(delay)
+
+        if site is None or page_id is None or page_id >= site.pages:
+            body, status = b"not found", 404
+        else:
+            body, status = site.render(page_id), 200
+        request.send_response(status)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+        with self.lock:
+            self.pages_served += 1
+            self.bytes_served += len(body)
+
+    @staticmethod
+    def _page_id(path):
+        if path in ("", "/"):
+            return 0
+        name = path.rstrip("/").rsplit("/", 1)[-1]
+        if name.startswith("page-") and name[5:].isdigit():
+            return int(name[5:])
+        return None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ReactorLagProbe:
+    """
+    Measures how late a periodic reactor call fires. Time spent in parsing
+    callbacks blocks the reactor and shows up directly as lag.
+    """
+
+    def __init__(self, interval=0.05):
+        from twisted.internet import task
+
+        self.interval = interval
+        self.samples = []
+        self._last = None
+        self._task = task.LoopingCall(self._tick)
+
+    def start(self):
+        self._last = time.perf_counter()
+        self._task.start(self.interval, now=False)
+
+    def stop(self):
+        if self._task.running:
+            self._task.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.samples.append(max(0.0, now - self._last - self.interval))
+        self._last = now
+
+    def summary(self):
+        if not self.samples:
+            return {"reactor_lag_mean_ms": 0.0, "reactor_lag_p95_ms": 0.0, "reactor_lag_max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        return {
+            "reactor_lag_mean_ms": statistics.fmean(ordered) * 1000,
+            "reactor_lag_p95_ms": p95 * 1000,
+            "reactor_lag_max_ms": ordered[-1] * 1000,
+        }
+
+
+def run_case(case, proxy_url, start_urls, result_queue):
+    """
+    Crawls the synthetic sites once with the settings of one benchmark case.
+    Runs in a child process and puts its measurements on ``result_queue``.
+    """
+    # HttpProxyMiddleware reads the proxy from the environment when it is created
+    os.environ["http_proxy"] = proxy_url
+    os.environ.pop("no_proxy", None)
+
+    from fake_useragent import UserAgent
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from twisted.internet import reactor
+
+    web_scraping = load_web_scraping()
+    web_scraping.MAX_LIMIT = case["budget"]
+
+    settings = web_scraping.crawl_settings(UserAgent())
+    settings.update({
+        "LOG_LEVEL": "WARNING",
+        "HTTPPROXY_ENABLED": True,
+        "CRAWL_DASHBOARD_ENABLED": False,
+        "HTML_PARSER": case["parser"],
+        "CONCURRENT_REQUESTS": case["concurrency"],
+        "CONCURRENT_REQUESTS_PER_DOMAIN": case["concurrency_per_domain"],
+        "DOWNLOAD_DELAY": case["download_delay"],
+    })
+    settings.update(case.get("settings", {}))
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(web_scraping.PatternCrawler)
+    probe = ReactorLagProbe()
+    crawler.signals.connect(probe.stop, signal=signals.spider_closed)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        process.crawl(
+            crawler,
+            start_urls=start_urls,
+            output_file=Path(temp_dir) / "benchmark.xlsx",
+            allowed_patterns=web_scraping.PATTERNS,
+        )
+        reactor.callWhenRunning(probe.start)
+        wall_start = time.perf_counter()
+        process.start()
+        wall_time = time.perf_counter() - wall_start
+
+    stats = crawler.stats.get_stats()
+    elapsed = stats.get("elapsed_time_seconds") or wall_time
+    pages = stats.get("item_scraped_count", 0)
+    response_bytes = stats.get("downloader/response_bytes", 0)
+    result = {
+        "name": case["name"],
+        "parser": case["parser"],
+        "concurrency": case["concurrency"],
+        "pages": pages,
+        "responses": stats.get("downloader/response_count", 0),
+        "elapsed_s": elapsed,
+        "wall_s": wall_time,
+        "pages_per_s": pages / elapsed if elapsed else 0.0,
+        "bytes_per_s": response_bytes / elapsed if elapsed else 0.0,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        **probe.summary(),
+    }
+    result_queue.put(result)
+
+
+def wait_for_result(process, result_queue, timeout=None, poll_interval=1.0):
+    """
+    Waits for the measurements of a case process.
+
+    Returns:
+        tuple: The result dictionary, or None and the reason the process
+               delivered none (it exited without a result or timed out, in
+               which case it is terminated).
+    """
+    started = time.monotonic()
+    while True:
+        try:
+            return result_queue.get(timeout=poll_interval), None
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # the result may have been flushed just before the process exited
+            try:
+                return result_queue.get(timeout=poll_interval), None
+            except queue.Empty:
+                return None, f"exited with code {process.exitcode} without a result"
+        if timeout is not None and time.monotonic() - started > timeout:
+            process.terminate()
+            return None, f"timed out after {timeout:.0f}s"
+
+
+def run_benchmark(cases, sites=20, pages=200, fanout=10, page_bytes=20_000, latency_ms=50,
+                  latency_distribution="lognormal", duplicate_ratio=0.0, seed=0, case_timeout=600):
+    """
+    Starts the synthetic site server and runs every benchmark case against it.
+
+    Args:
+        cases (list): Dictionaries with ``name``, ``parser``, ``concurrency``,
+            ``concurrency_per_domain``, ``download_delay``, ``budget`` and an
+            optional ``settings`` override dictionary.
+        sites (int): Number of synthetic domains.
+        pages (int): Pages per domain.
+        fanout (int): Links per page.
+        page_bytes (int): Approximate page size.
+        latency_ms (float): Mean server latency.
+        latency_distribution (str): One of LATENCY_DISTRIBUTIONS.
+        duplicate_ratio (float): Share of pages duplicating the home page.
+        seed (int): Seed for content and latency.
+        case_timeout (float, optional): Seconds a case may run before it is
+            terminated. None waits as long as the crawler process is alive.
+
+    Returns:
+        pd.DataFrame: One row of measurements per case. Cases whose process
+        failed only have their name and an ``error``.
+    """
+    site_list = [
+        SyntheticSite(f"bench-site-{i:03d}.com", pages, fanout, page_bytes, duplicate_ratio, seed)
+        for i in range(sites)
+    ]
+    server = SyntheticSiteServer(site_list, latency_ms, latency_distribution, seed).start()
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for case in cases:
+            result_queue = context.Queue()
+            served_before = server.pages_served
+            process = context.Process(target=run_case, args=(case, server.url, server.start_urls(), result_queue))
+            process.start()
+            result, error = wait_for_result(process, result_queue, case_timeout)
+            process.join()
+            if result is None:
+                results.append({"name": case["name"], "error": error})
+                print(f"{case['name']}: crawler process {error}")
+                continue
+            result["server_pages"] = server.pages_served - served_before
+            results.append(result)
+            print(f"{case['name']}: {result['pages_per_s']:.1f} pages/s, {result['peak_rss_mb']:.0f} MB peak RSS")
+    finally:
+        server.stop()
+    return pd.DataFrame(results)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark PatternCrawler against synthetic local websites")
+    parser.add_argument("--sites", type=int, default=20, help="Number of synthetic domains")
+    parser.add_argument("--pages", type=int, default=200, help="Pages per domain")
+    parser.add_argument("--fanout", type=int, default=10, help="Links per page")
+    parser.add_argument("--page-bytes", type=int, default=20_000, help="Approximate page size in bytes")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mean server latency in milliseconds")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="Latency distribution")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of pages repeating the home page content")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 300], help="CONCURRENT_REQUESTS values to compare")
+    parser.add_argument("--per-domain", type=int, default=10, help="CONCURRENT_REQUESTS_PER_DOMAIN")
+    parser.add_argument("--download-delay", type=float, default=0.0, help="DOWNLOAD_DELAY")
+    parser.add_argument("--parsers", nargs="+", default=["html.parser"], help="BeautifulSoup parser engines to compare")
+    parser.add_argument("--budget", type=int, default=10, help="Pages per domain (MAX_LIMIT)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for content and latency")
+    parser.add_argument("--case-timeout", type=float, default=600, help="Seconds before a case is terminated")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results")
+    return vars(parser.parse_args())
+
+
+def main():
+    args = parse_arguments()
+    cases = [
+        {
+            "name": f"{parser_engine}-c{concurrency}",
+            "parser": parser_engine,
+            "concurrency": concurrency,
+            "concurrency_per_domain": args["per_domain"],
+            "download_delay": args["download_delay"],
+            "budget": args["budget"],
+        }
+        for parser_engine in args["parsers"]
+        for concurrency in args["concurrency"]
+    ]
+    report = run_benchmark(
+        cases,
+        sites=args["sites"],
+        pages=args["pages"],
+        fanout=args["fanout"],
+        page_bytes=args["page_bytes"],
+        latency_ms=args["latency_ms"],
+        latency_distribution=args["latency_dist"],
+        duplicate_ratio=args["duplicate_ratio"],
+        seed=args["seed"],
+        case_timeout=args["case_timeout"],
+    )
+    print(report.to_string(index=False))
+    if args["output"]:
+        Path(args["output"]).write_text(json.dumps(report.to_dict("records"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
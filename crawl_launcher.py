@@ -0,0 +1,225 @@
+"""
+
+Runs PatternCrawler from web-scraping.py across several worker processes on a
+single machine. Start URLs are hash-partitioned by domain so every domain is
+crawled by exactly one worker, each worker writes its own output shard, and the
+shards plus their per-domain stats are merged once all workers have finished.
+
+This is the local counterpart of the splitter / extract-data / aggregator
+containers described in ecs-container.json.
+
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import sys
+from multiprocessing import cpu_count
+from pathlib import Path
+
+import pandas as pd
+
+WEB_SCRAPING_PATH = Path(__file__).with_name("web-scraping.py")
+WEB_SCRAPING_MODULE = "web_scraping"
+
+
+def load_web_scraping():
+    """
+    Imports web-scraping.py, whose file name is not a valid module name.
+
+    The module is registered as ``web_scraping`` so that settings referring to
+    its classes by path (e.g. DomainBudgetMiddleware) can be resolved by Scrapy.
+
+    Returns:
+        module: The loaded web-scraping module.
+    """
+    if WEB_SCRAPING_MODULE in sys.modules:
+        return sys.modules[WEB_SCRAPING_MODULE]
+    spec = importlib.util.spec_from_file_location(WEB_SCRAPING_MODULE, WEB_SCRAPING_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[WEB_SCRAPING_MODULE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def shard_for_domain(domain, workers):
+    """
+    Maps a domain to a worker index. A stable digest is used instead of hash(),
+    which is salted per process.
+    """
+    digest = hashlib.md5(domain.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % workers
+
+
+def partition_urls(urls, workers):
+    """
+    Splits start URLs into one list per worker, keeping each domain together.
+
+    Args:
+        urls (list): Start URLs to crawl.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: A list of ``workers`` URL lists, some of which may be empty.
+    """
+    web_scraping = load_web_scraping()
+    shards = [[] for _ in range(workers)]
+    for url in urls:
+        domain = web_scraping.extract_domain(url) or url
+        shards[shard_for_domain(domain, workers)].append(url)
+    return shards
+
+
+def shard_paths(shard_dir, shard_id):
+    """Returns the output, stats and log file locations of one shard."""
+    stem = Path(shard_dir) / f"shard_{shard_id:03d}"
+    return (
+        stem.with_suffix(".xlsx"),
+        stem.with_suffix(".stats.json"),
+        stem.with_suffix(".log"),
+    )
+
+
+def run_shard(shard_id, urls, shard_dir, depth=2):
+    """
+    Crawls one partition of start URLs in its own process and reactor.
+
+    Args:
+        shard_id (int): Index of the partition, used to name its files.
+        urls (list): Start URLs assigned to this worker.
+        shard_dir (str): Directory receiving the shard output.
+        depth (int): Maximum crawl depth passed to PatternCrawler.
+    """
+    from fake_useragent import UserAgent
+    from scrapy.crawler import CrawlerProcess
+
+    web_scraping = load_web_scraping()
+    output_file, stats_file, log_file = shard_paths(shard_dir, shard_id)
+
+    settings = web_scraping.crawl_settings(UserAgent())
+    settings["LOG_FILE"] = str(log_file)
+    # several workers would fight over the terminal
+    settings["CRAWL_DASHBOARD_ENABLED"] = False
+    process = CrawlerProcess(settings)
+    process.crawl(
+        web_scraping.PatternCrawler,
+        start_urls=urls,
+        max_depth=depth,
+        output_file=output_file,
+        allowed_patterns=web_scraping.PATTERNS,
+        stats_file=stats_file,
+    )
+    process.start()
+
+
+def merge_shards(shard_dir, shard_ids, output_file):
+    """
+    Combines the shard outputs and their per-domain stats.
+
+    Args:
+        shard_dir (str): Directory holding the shard files.
+        shard_ids (list): Shards that were launched.
+        output_file (str): Location of the merged spreadsheet. The merged stats
+            are written next to it with a ``.stats.json`` suffix.
+
+    Returns:
+        tuple: The merged DataFrame and the merged stats dictionary.
+    """
+    frames = []
+    stats = {"total_scraped": 0, "scraped_counts": {}, "closed_domains": [], "shards": {}}
+    for shard_id in shard_ids:
+        shard_output, shard_stats, _ = shard_paths(shard_dir, shard_id)
+        if shard_output.exists():
+            frames.append(pd.read_excel(shard_output))
+        else:
+            logging.warning(f"Shard {shard_id} produced no output file")
+        if not shard_stats.exists():
+            stats["shards"][shard_id] = "missing"
+            continue
+        shard = json.loads(shard_stats.read_text())
+        stats["shards"][shard_id] = shard["reason"]
+        stats["total_scraped"] += shard["total_scraped"]
+        for domain, count in shard["scraped_counts"].items():
+            stats["scraped_counts"][domain] = stats["scraped_counts"].get(domain, 0) + count
+        stats["closed_domains"].extend(shard["closed_domains"])
+
+    stats["closed_domains"].sort()
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["url", "title", "body"])
+    merged.to_excel(output_file, index=False)
+    Path(output_file).with_suffix(".stats.json").write_text(json.dumps(stats, indent=2))
+    return merged, stats
+
+
+def launch(urls, workers, output_file, shard_dir, depth=2):
+    """
+    Partitions the start URLs, crawls every non-empty partition in its own
+    process and merges the results.
+
+    Args:
+        urls (list): Start URLs to crawl.
+        workers (int): Number of worker processes.
+        output_file (str): Location of the merged spreadsheet.
+        shard_dir (str): Directory receiving the per-worker shards.
+        depth (int): Maximum crawl depth passed to PatternCrawler.
+
+    Returns:
+        tuple: The merged DataFrame and the merged stats dictionary.
+    """
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    partitions = partition_urls(urls, workers)
+
+    # spawn gives each worker a clean interpreter, so no reactor state is inherited
+    context = multiprocessing.get_context("spawn")
+    processes = {}
+    for shard_id, shard_urls in enumerate(partitions):
+        if not shard_urls:
+            continue
+        process = context.Process(
+            target=run_shard,
+            args=(shard_id, shard_urls, str(shard_dir), depth),
+            name=f"crawl-shard-{shard_id}",
+        )
+        process.start()
+        processes[shard_id] = process
+        logging.info(f"Started shard {shard_id} with {len(shard_urls)} start URLs (pid {process.pid})")
+
+    for shard_id, process in processes.items():
+        process.join()
+        if process.exitcode != 0:
+            logging.error(f"Shard {shard_id} exited with code {process.exitcode}")
+
+    return merge_shards(shard_dir, list(processes), output_file)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Domain-sharded multi-process PatternCrawler launcher")
+    parser.add_argument("--workers", type=int, default=cpu_count(), help="Number of crawler processes")
+    parser.add_argument("--urls-file", type=str, default=None, help="File with one start URL per line (defaults to web-scraping.py START_URLS)")
+    parser.add_argument("--output", type=str, default="scraped_data.xlsx", help="Merged output spreadsheet")
+    parser.add_argument("--shard-dir", type=str, default="crawl_shards", help="Directory for per-worker shards")
+    parser.add_argument("--depth", type=int, default=2, help="Maximum crawl depth")
+    return vars(parser.parse_args())
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    args = parse_arguments()
+    if args["urls_file"]:
+        urls = [line.strip() for line in Path(args["urls_file"]).read_text().splitlines() if line.strip()]
+    else:
+        urls = load_web_scraping().START_URLS
+
+    merged, stats = launch(urls, max(1, args["workers"]), args["output"], args["shard_dir"], args["depth"])
+    if not merged.empty:
+        web_scraping = load_web_scraping()
+        merged["domain"] = merged["url"].apply(web_scraping.extract_domain)
+        print(merged.groupby("domain").size())
+    print(merged.shape)
+    print(f"Shard close reasons: {stats['shards']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ from urllib.parse import urlparse, urljoin
 from urllib.robotparser import RobotFileParser 
 from bs4 import BeautifulSoup  
 import re  
+
+from page_encoding import decode_response
   
 def get_terms_of_use_link(url): 
     """  
@@ -22,8 +24,20 @@ def get_terms_of_use_link(url):
         url += "/"
         
     response = requests.get(url)  
+    return find_terms_of_use_link(decode_response(response), url)  
+  
+def find_terms_of_use_link(html, url):  
+    """  
+    Finds the terms of use link in the HTML of a page that was already downloaded.  
+      
+    Args:  
+    html (str): The HTML of the page.  
+    url (str): The URL the page was downloaded from, used to resolve relative links.  
       
-    soup = BeautifulSoup(response.text, 'html.parser')  
+    Returns:  
+    str or None: The terms of use link if found, otherwise None.  
+    """  
+    soup = BeautifulSoup(html, 'html.parser')  
   
     terms_links = []  
     patterns = ['terms of use', 'terms & conditions', 'terms and conditions', 'terms of service', 'user agreement']  
@@ -51,7 +65,7 @@ def crawl_terms_of_use_page(terms_url):
         str: The text content of the Terms of Use page.  
     """  
     response = requests.get(terms_url)  
-    soup = BeautifulSoup(response.text, 'html.parser') 
+    soup = BeautifulSoup(decode_response(response), 'html.parser') 
     
     # Check if there are language or region-specific links  
     for link in soup.find_all("a", href=True):  
@@ -60,7 +74,7 @@ def crawl_terms_of_use_page(terms_url):
             terms_url = urljoin(terms_url, link["href"])  
             print(f"Terms of Use US specific: {terms_url}")  
             response = requests.get(terms_url)  
-            soup = BeautifulSoup(response.text, "html.parser")  
+            soup = BeautifulSoup(decode_response(response), "html.parser")  
             break  
   
     # print(soup.prettify())
@@ -153,7 +167,7 @@ def meta_information(url):
         str: A formatted string containing the webpage title and meta description.  
     """  
     response = requests.get(url)  
-    soup = BeautifulSoup(response.text, 'html.parser')  
+    soup = BeautifulSoup(decode_response(response), 'html.parser')  
 
     title = soup.title.text  
     meta_desc = soup.find('meta', attrs={'name': 'description'})['content']
@@ -204,7 +218,7 @@ def get_about_us_text(about_us_url, headers):
     if not about_us_url.endswith("/"):
         about_us_url += "/"
     response = requests.get(about_us_url, headers=headers)    
-    soup = BeautifulSoup(response.text, 'html.parser')  
+    soup = BeautifulSoup(decode_response(response), 'html.parser')  
   
     # Remove script and style elements  
     for element in soup(['script', 'style']):  
@@ -249,7 +263,7 @@ def crawl_website(url: str, user_agent: str="Googlebot") -> str:
     """ 
     robots_txt_url = get_robots_txt_url(url)  
     response = requests.get(robots_txt_url)  
-    robots_txt_content = response.text  
+    robots_txt_content = decode_response(response)  
   
     rp = RobotFileParser()  
     rp.parse(robots_txt_content.splitlines())  
@@ -294,7 +308,7 @@ def crawl_website(url: str, user_agent: str="Googlebot") -> str:
             response = requests.get(url, headers={"User-Agent": user_agent}, timeout=10, allow_redirects=True)
             if response.status_code == 200:  
                 print("Crawling:", url)  
-                about_us_url = get_about_us_url(response.text, link)  
+                about_us_url = get_about_us_url(decode_response(response), link)  
                 if about_us_url:  
                     print("About Us URL:", about_us_url)  
                     about_us_text = get_about_us_text(about_us_url, headers={"User-Agent": user_agent})  
@@ -0,0 +1,430 @@
+"""
+
+Runs the evaluations of llm_evaluation.py across several worker processes.
+
+Every (system, item) evaluation is assigned to a shard by the hash of its
+sample, so identical samples always meet in the same worker and are still
+evaluated only once. Each worker runs evaluate_systems_and_track in its own
+event loop, which keeps the CPU work of building samples and post-processing
+judge output from stalling the I/O of the other workers. With a shard
+directory every worker keeps its own result log and score cache, and a rerun
+with resume=True continues each shard where it stopped. Workers return their
+results keyed by job, and the parent puts them back into the input order.
+
+FakeJudgeLLM stands in for the judge model. It answers every metric with a
+deterministic score after a configurable latency and CPU cost, so the
+throughput and overhead of the pipeline itself can be measured without a
+network.
+
+Usage:
+    python evaluation_launcher.py --workers 1 2 4 --items 500 --latency-ms 200 --cpu-ms 2
+
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import json
+import logging
+import multiprocessing
+import random
+import time
+from multiprocessing import cpu_count
+from pathlib import Path
+
+import pandas as pd
+
+from llm_evaluation import (
+    METRIC_NAMES,
+    EvaluationCache,
+    MetricRegistry,
+    ResultLog,
+    evaluate_systems_and_track,
+    has_required_fields,
+    job_key,
+    plan_evaluations,
+    sample_key,
+)
+from synthetic_latency import LATENCY_DISTRIBUTIONS, sample_latency
+
+# Fields of a system config the workers need; model clients stay in the parent
+WORKER_CONFIG_FIELDS = ("prompt_tag", "judge_backend", "llm_model_name")
+
+
+class FakeJudgeLLM:
+    """
+    Local stand-in for the judge model of the ragas metrics.
+
+    Every call waits for a latency drawn from a seeded generator, spends
+    ``cpu_ms`` of CPU time in the event loop, as parsing a real judge answer
+    would, and returns a score in [0, 1). Latency, failures and scores only
+    depend on the seed, the metric and the sample, so runs are reproducible
+    regardless of scheduling.
+
+    Args:
+        latency_ms (float): Mean latency of one judge call.
+        latency_distribution (str): One of LATENCY_DISTRIBUTIONS.
+        cpu_ms (float): CPU time spent per judge call.
+        calls_per_metric (int): Judge calls per metric and sample; ragas
+            metrics such as faithfulness make several.
+        failure_rate (float): Share of metric evaluations that raise.
+        seed (int): Seed for latencies, failures and scores.
+    """
+
+    def __init__(self, latency_ms=200, latency_distribution="lognormal", cpu_ms=0.0, calls_per_metric=1,
+                 failure_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.cpu_ms = cpu_ms
+        self.calls_per_metric = calls_per_metric
+        self.failure_rate = failure_rate
+        self.seed = seed
+        # judge_identity keys the score cache on this, scores of other seeds are never reused
+        self.model_name = f"fake-judge-{seed}"
+        self.calls = 0
+
+    def _rng(self, metric_name, sample):
+        payload = json.dumps(
+            [self.seed, metric_name, sample.user_input, sample.response, sample.reference], ensure_ascii=False
+        )
+        return random.Random(hashlib.sha256(payload.encode("utf-8")).digest())
+
+    async def judge(self, metric_name, sample):
+        """Scores one metric on one sample."""
+        rng = self._rng(metric_name, sample)
+        for _ in range(max(1, self.calls_per_metric)):
+            self.calls += 1
+            await asyncio.sleep(sample_latency(rng, self.latency_distribution, self.latency_ms))
+            busy_until = time.perf_counter() + self.cpu_ms / 1000
+            while time.perf_counter() < busy_until:
+                pass
+        if rng.random() < self.failure_rate:
+            raise RuntimeError(f"Fake judge failure for metric '{metric_name}'")
+        return rng.random()
+
+
+class FakeJudgeMetric:
+    """Metric object with the ragas ``single_turn_ascore`` interface, scored by a FakeJudgeLLM."""
+
+    def __init__(self, name, llm):
+        self.name = name
+        self.llm = llm
+
+    async def single_turn_ascore(self, sample):
+        return await self.llm.judge(self.name, sample)
+
+
+# Drop-in for METRIC_FACTORIES; partials of a class can be sent to worker processes
+FAKE_METRIC_FACTORIES = {name: functools.partial(FakeJudgeMetric, name) for name in METRIC_NAMES}
+
+
+def shard_for_sample(data_point, workers):
+    """
+    Maps a data point to a worker index by its sample, so identical samples of
+    any system land in the same worker.
+    """
+    return int(sample_key(data_point)[:16], 16) % workers
+
+
+def partition_data(systems_config, evaluation_data_per_system, workers):
+    """
+    Splits the evaluation data into one part per worker.
+
+    Data points without the fields an evaluation needs are dropped here, as
+    plan_evaluations would drop them, so that the merged results line up with
+    what a single-process run returns.
+
+    Returns:
+        tuple: A list of ``workers`` per-system data dicts, and a dict mapping
+               the job_key every data point gets in its shard to its system
+               and its position in the merged results of that system.
+    """
+    shards = [{} for _ in range(workers)]
+    slots = {}
+    for system_id, data_points in evaluation_data_per_system.items():
+        if system_id not in systems_config:
+            logging.warning(f"Skipping system '{system_id}' found in data but not in systems_config.")
+            continue
+        position = 0
+        for i, data_point in enumerate(data_points):
+            if not has_required_fields(data_point):
+                logging.warning(f"Skipping data point {i} for system {system_id} due to missing 'user_query', 'reference', or 'model_response'.")
+                continue
+            shard_id = shard_for_sample(data_point, workers)
+            shard_points = shards[shard_id].setdefault(system_id, [])
+            # The worker plans this data point at its index within the shard, so its job_key uses that index
+            key = job_key({"system_id": system_id, "item_index": len(shard_points), "data_point": data_point})
+            shard_points.append(data_point)
+            slots[key] = (system_id, position)
+            position += 1
+    return shards, slots
+
+
+def shard_paths(shard_dir, shard_id):
+    """Returns the result log and score cache locations of one shard."""
+    stem = Path(shard_dir) / f"shard_{shard_id:03d}"
+    return stem.with_suffix(".results.jsonl"), stem.with_suffix(".cache.jsonl")
+
+
+def run_evaluation_shard(shard_id, systems_config, shard_data, shard_dir=None, llm_factory=None,
+                         metric_factories=None, max_concurrency=64, rate_limits=None, resume=False,
+                         log_level=logging.WARNING):
+    """
+    Evaluates one part of the data in its own process and event loop.
+
+    Args:
+        shard_id (int): Index of the part, used to name its files.
+        systems_config (dict): System configs reduced to WORKER_CONFIG_FIELDS.
+        shard_data (dict): Data points of this part per system.
+        shard_dir (str, optional): Directory for the result log and score
+            cache of the shard. Nothing is written when None.
+        llm_factory (callable, optional): Builds the judge model inside the
+            worker, e.g. a partial of FakeJudgeLLM. Judge clients usually
+            cannot be pickled, so they are never sent to the worker.
+        metric_factories (dict, optional): Replaces METRIC_FACTORIES, e.g.
+            FAKE_METRIC_FACTORIES.
+        max_concurrency (int): Evaluations in flight in this worker.
+        rate_limits (dict, optional): This worker's share of the rate limits.
+        resume (bool): Skip jobs already in the shard's result log.
+        log_level (int): Logging level of the worker.
+
+    Returns:
+        dict: The shard id, its results by job_key and run statistics.
+    """
+    logging.getLogger().setLevel(log_level)
+    evaluation_llm = llm_factory() if llm_factory is not None else None
+    registry = MetricRegistry(metric_factories) if metric_factories is not None else None
+
+    result_log, cache = None, None
+    if shard_dir is not None:
+        log_path, cache_path = shard_paths(shard_dir, shard_id)
+        result_log, cache = ResultLog(str(log_path)), EvaluationCache(str(cache_path))
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        results = asyncio.run(evaluate_systems_and_track(
+            systems_config,
+            shard_data,
+            evaluation_llm,
+            max_concurrency=max_concurrency,
+            rate_limits=rate_limits,
+            cache=cache,
+            result_log=result_log,
+            resume=resume,
+            registry=registry,
+        ))
+    finally:
+        if result_log is not None:
+            result_log.close()
+
+    # evaluate_systems_and_track returns each system's results in plan order
+    ordered = {system_id: iter(system_results) for system_id, system_results in results.items()}
+    keyed = {job_key(job): next(ordered[job["system_id"]]) for job in plan_evaluations(systems_config, shard_data)}
+
+    return {
+        "shard_id": shard_id,
+        "results": keyed,
+        "evaluations": sum(len(data_points) for data_points in shard_data.values()),
+        "judge_calls": getattr(evaluation_llm, "calls", None),
+        "seconds": time.perf_counter() - started,
+        "cpu_seconds": time.process_time() - cpu_started,
+    }
+
+
+def merge_shard_results(systems_config, slots, shard_outputs):
+    """
+    Puts the results of every shard back at the positions their data points
+    had in the input, looking each one up by its job_key.
+
+    Raises:
+        RuntimeError: A shard returned a job that was not planned, or a
+            planned job has no result.
+
+    Returns:
+        dict: The results per system, as returned by evaluate_systems_and_track.
+    """
+    merged = {system_id: {} for system_id in systems_config}
+    for output in shard_outputs:
+        for key, metrics in output["results"].items():
+            if key not in slots:
+                raise RuntimeError(f"Shard {output['shard_id']} returned an unplanned job {key}")
+            system_id, position = slots[key]
+            merged[system_id][position] = metrics
+    missing = len(slots) - sum(len(results) for results in merged.values())
+    if missing:
+        raise RuntimeError(f"{missing} of {len(slots)} planned evaluations have no result")
+    return {system_id: [results[position] for position in sorted(results)] for system_id, results in merged.items()}
+
+
+def launch(systems_config, evaluation_data_per_system, workers=cpu_count(), shard_dir=None, llm_factory=None,
+           metric_factories=None, max_concurrency=64, rate_limits=None, resume=False, log_level=logging.WARNING):
+    """
+    Partitions the evaluations, runs every non-empty part in its own process
+    and merges the results.
+
+    Args:
+        systems_config (dict): As for evaluate_systems_and_track.
+        evaluation_data_per_system (dict): As for evaluate_systems_and_track.
+        workers (int): Number of worker processes.
+        shard_dir (str, optional): Directory for per-shard result logs and
+            score caches, which also makes the run resumable with ``resume``.
+        llm_factory (callable, optional): Picklable callable building the
+            judge model in each worker.
+        metric_factories (dict, optional): Picklable metric factories
+            replacing METRIC_FACTORIES.
+        max_concurrency (int): Evaluations in flight per worker.
+        rate_limits (dict, optional): Calls per second per judge backend for
+            the whole run; every worker gets an equal share.
+        resume (bool): Skip jobs already in the shard result logs. Only
+            resume a shard_dir written for the same data and metrics.
+        log_level (int): Logging level of the workers.
+
+    Returns:
+        tuple: The merged results per system and a DataFrame of per-shard
+               statistics.
+    """
+    if shard_dir is not None:
+        Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    shards, slots = partition_data(systems_config, evaluation_data_per_system, workers)
+    active = [shard_id for shard_id, shard_data in enumerate(shards) if shard_data]
+    worker_config = {
+        system_id: {field: config[field] for field in WORKER_CONFIG_FIELDS if field in config}
+        for system_id, config in systems_config.items()
+    }
+    worker_limits = {backend: rate / len(active) for backend, rate in (rate_limits or {}).items()} if active else None
+
+    outputs = []
+    # spawn gives each worker a clean interpreter without the parent's event loop or client state
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, len(active)), mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                run_evaluation_shard, shard_id, worker_config, shards[shard_id], shard_dir, llm_factory,
+                metric_factories, max_concurrency, worker_limits, resume, log_level,
+            ): shard_id
+            for shard_id in active
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                output = future.result()
+            except Exception as e:
+                logging.error(f"Shard {futures[future]} failed: {e}")
+                continue
+            outputs.append(output)
+            logging.info(f"Shard {output['shard_id']} finished {output['evaluations']} evaluations in {output['seconds']:.1f}s")
+
+    if len(outputs) < len(active):
+        raise RuntimeError(f"{len(active) - len(outputs)} of {len(active)} shards failed, rerun with the same shard_dir and resume=True to continue")
+
+    stats = pd.DataFrame([{key: value for key, value in output.items() if key != "results"} for output in outputs])
+    return merge_shard_results(systems_config, slots, outputs), stats.sort_values("shard_id", ignore_index=True) if not stats.empty else stats
+
+
+def synthetic_data(systems=3, items=200, duplicate_ratio=0.0, seed=0):
+    """
+    Generates system configs and evaluation data for benchmarks. Every system
+    answers the same questions; ``duplicate_ratio`` of the answers repeat an
+    earlier answer of the same system word for word.
+
+    Returns:
+        tuple: The systems config and the evaluation data per system.
+    """
+    rng = random.Random(seed)
+    systems_config = {f"system_{s}": {"prompt_tag": f"synthetic-v{s}"} for s in range(systems)}
+    evaluation_data = {}
+    for system_id in systems_config:
+        data_points = []
+        for i in range(items):
+            if data_points and rng.random() < duplicate_ratio:
+                data_points.append(dict(rng.choice(data_points)))
+                continue
+            data_points.append({
+                "user_query": f"Synthetic question {i}?",
+                "reference": [f"Reference passage {i}.{k}" for k in range(3)],
+                "model_response": f"Answer of {system_id} to question {i}, variant {rng.randrange(10 ** 6)}.",
+            })
+        evaluation_data[system_id] = data_points
+    return systems_config, evaluation_data
+
+
+def run_benchmark(worker_counts, systems=3, items=200, duplicate_ratio=0.0, latency_ms=200,
+                  latency_distribution="lognormal", cpu_ms=0.0, calls_per_metric=1, failure_rate=0.0,
+                  max_concurrency=64, seed=0):
+    """
+    Evaluates the same synthetic data against FakeJudgeLLM with each worker
+    count and reports the throughput.
+
+    Returns:
+        pandas.DataFrame: One row per worker count with the wall time,
+        evaluations and judge calls per second, and the CPU time the pipeline
+        spent per evaluation.
+    """
+    systems_config, evaluation_data = synthetic_data(systems, items, duplicate_ratio, seed)
+    llm_factory = functools.partial(
+        FakeJudgeLLM, latency_ms, latency_distribution, cpu_ms, calls_per_metric, failure_rate, seed
+    )
+    rows = []
+    for workers in worker_counts:
+        started = time.perf_counter()
+        results, stats = launch(
+            systems_config, evaluation_data, workers, llm_factory=llm_factory,
+            metric_factories=FAKE_METRIC_FACTORIES, max_concurrency=max_concurrency,
+        )
+        seconds = time.perf_counter() - started
+        evaluations = sum(len(system_results) for system_results in results.values())
+        judge_calls = int(stats["judge_calls"].sum())
+        rows.append({
+            "workers": workers,
+            "evaluations": evaluations,
+            "judge_calls": judge_calls,
+            "seconds": seconds,
+            "evaluations_per_s": evaluations / seconds,
+            "judge_calls_per_s": judge_calls / seconds,
+            "slowest_shard_s": stats["seconds"].max(),
+            "cpu_ms_per_evaluation": stats["cpu_seconds"].sum() / max(1, evaluations) * 1000,
+        })
+        logging.info(f"{workers} workers: {evaluations} evaluations in {seconds:.1f}s")
+    return pd.DataFrame(rows)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the sharded evaluation runner against a local fake judge")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, cpu_count()], help="Worker process counts to compare")
+    parser.add_argument("--systems", type=int, default=3, help="Number of synthetic systems")
+    parser.add_argument("--items", type=int, default=200, help="Evaluation items per system")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of answers repeating an earlier one")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean judge latency in milliseconds")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="lognormal", help="Judge latency distribution")
+    parser.add_argument("--cpu-ms", type=float, default=0.0, help="CPU time per judge call in milliseconds")
+    parser.add_argument("--calls-per-metric", type=int, default=1, help="Judge calls per metric and sample")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of metric evaluations that fail")
+    parser.add_argument("--concurrency", type=int, default=64, help="Evaluations in flight per worker")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for data, latencies and scores")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results")
+    return vars(parser.parse_args())
+
+
+def main():
+    args = parse_arguments()
+    report = run_benchmark(
+        args["workers"],
+        systems=args["systems"],
+        items=args["items"],
+        duplicate_ratio=args["duplicate_ratio"],
+        latency_ms=args["latency_ms"],
+        latency_distribution=args["latency_dist"],
+        cpu_ms=args["cpu_ms"],
+        calls_per_metric=args["calls_per_metric"],
+        failure_rate=args["failure_rate"],
+        max_concurrency=args["concurrency"],
+        seed=args["seed"],
+    )
+    print(report.to_string(index=False))
+    if args["output"]:
+        Path(args["output"]).write_text(json.dumps(report.to_dict("records"), indent=2))
+
+
+if __name__ == "__main__":
+    main()
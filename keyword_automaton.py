@@ -0,0 +1,86 @@
+"""
+
+Aho-Corasick automaton for finding many keywords in one pass over a text.
+
+The keywords are compiled once into a trie with failure links, after which a
+text is scanned character by character, reporting every (possibly
+overlapping) occurrence of every keyword in time linear in the length of the
+text plus the number of matches.
+
+"""
+
+from collections import deque
+
+
+class KeywordAutomaton:
+    """
+    Compiled multi-pattern matcher.
+
+    Args:
+        keywords (list): Keywords to look for. Matching is case-insensitive, the
+            keywords and the scanned text are both lowercased.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._alphabet = set()
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                self._alphabet.add(char)
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] = self._output[state] + (index,)
+
+        # breadth-first pass so every failure link points to an already finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """
+        Yields ``(start, keyword)`` for every keyword occurrence in the text.
+
+        Args:
+            text (str): Text to scan. It is lowercased before matching.
+        """
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self.keywords
+        alphabet = self._alphabet
+        state = 0
+        for position, char in enumerate(text.lower()):
+            if char not in alphabet:
+                state = 0
+                continue
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                keyword = keywords[index]
+                yield position - len(keyword) + 1, keyword
+
+    def find_all(self, text):
+        """Returns every ``(start, keyword)`` occurrence in the text as a list."""
+        return list(self.iter_matches(text))
+
+    def contains_any(self, text):
+        """Returns True as soon as any keyword is found in the text."""
+        for _ in self.iter_matches(text):
+            return True
+        return False
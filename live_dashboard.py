@@ -0,0 +1,136 @@
+"""
+
+Low-overhead live terminal dashboard for long running jobs (crawls, parallel
+API calls), built from the same grouped Progress-in-Live layout as
+rich_dynamic_progress_bar.py.
+
+Producers only bump plain counters on every event. All rendering work, such
+as syncing the progress bars and computing rates, happens when Live refreshes,
+which is a few times per second whatever the event rate is.
+
+"""
+
+import time
+
+from rich.console import Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.progress import (
+    BarColumn,
+    Progress,
+    TextColumn,
+    TimeElapsedColumn,
+)
+
+
+class DashboardCounters:
+    """
+    Counters fed by the job. Updating them is a plain attribute increment.
+
+    ``groups`` maps a group name (e.g. a domain) to its completed count. It can
+    be replaced by a dictionary the job already maintains, so that per-group
+    progress costs nothing extra per event.
+    """
+
+    def __init__(self, groups=None):
+        self.completed = 0
+        self.errors = 0
+        self.bytes = 0
+        self.queue_depth = 0
+        self.groups = groups if groups is not None else {}
+
+
+class LiveDashboard:
+    """
+    Renders DashboardCounters inside a rich Live display.
+
+    Args:
+        counters (DashboardCounters): Source of the numbers to display.
+        title (str): Panel title.
+        total (int, optional): Expected number of completed events, if known.
+        group_budget (int, optional): Target count per group. Groups that
+            reached it are hidden from the panel.
+        refresh_per_second (float): Refresh rate of the display.
+        max_groups (int): Maximum number of group bars shown at once.
+    """
+
+    def __init__(self, counters, title="Progress", total=None, group_budget=None,
+                 refresh_per_second=2, max_groups=12):
+        self.counters = counters
+        self.title = title
+        self.group_budget = group_budget
+        self.max_groups = max_groups
+        self.rate = 0.0
+        self._last_time = time.monotonic()
+        self._last_completed = 0
+        self._group_tasks = {}
+
+        # per-group bars, hidden again once the group is done
+        self.group_progress = Progress(
+            TextColumn("[bold blue]{task.fields[name]}"),
+            BarColumn(),
+            TextColumn("({task.completed} of {task.total})"),
+        )
+        # overall bar carrying the summary counters
+        self.overall_progress = Progress(
+            TimeElapsedColumn(), BarColumn(), TextColumn("{task.description}")
+        )
+        self.overall_task_id = self.overall_progress.add_task("", total=total)
+        self.live = Live(self, refresh_per_second=refresh_per_second)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self.live.start()
+
+    def stop(self):
+        self.live.stop()
+
+    def _update_rate(self):
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if elapsed >= 0.5:
+            instant = (self.counters.completed - self._last_completed) / elapsed
+            # light smoothing so the number does not flicker between refreshes
+            self.rate = instant if self.rate == 0 else 0.7 * self.rate + 0.3 * instant
+            self._last_time = now
+            self._last_completed = self.counters.completed
+
+    def _sync_groups(self):
+        shown = 0
+        finished = 0
+        for name, count in list(self.counters.groups.items()):
+            done = self.group_budget is not None and count >= self.group_budget
+            finished += done
+            visible = not done and shown < self.max_groups
+            task_id = self._group_tasks.get(name)
+            if task_id is None:
+                if not visible:
+                    continue
+                task_id = self.group_progress.add_task("", total=self.group_budget, name=name)
+                self._group_tasks[name] = task_id
+            self.group_progress.update(task_id, completed=count, visible=visible)
+            shown += visible
+        return finished
+
+    def __rich__(self):
+        counters = self.counters
+        self._update_rate()
+        finished = self._sync_groups()
+        description = (
+            f"[bold]{counters.completed} done[/] | {self.rate:.1f}/s | "
+            f"queue {counters.queue_depth} | [red]{counters.errors} errors[/] | "
+            f"{counters.bytes / 1024 / 1024:.1f} MB"
+        )
+        if self.group_budget is not None and counters.groups:
+            description += f" | {finished}/{len(counters.groups)} groups done"
+        self.overall_progress.update(self.overall_task_id, completed=counters.completed, description=description)
+        return Group(
+            Panel(self.group_progress, title=self.title),
+            self.overall_progress,
+        )
@@ -1,22 +1,208 @@
+import numpy as np
 import pandas as pd
-from scipy.stats import mannwhitneyu
-from typing import Dict, List, Any, Tuple
-import statistics
+from scipy import sparse
+from scipy.stats import binom, norm, wilcoxon
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import logging
+import hashlib
+import json
+import math
+import os
 import asyncio
 import random # Keep for evaluate_response simulation if needed
+import threading
 from datetime import datetime
 
+import ragas
 from ragas import SingleTurnSample
 from ragas.metrics import Faithfulness, LLMContextPrecisionWithReference, ResponseGroundedness, AspectCritic, LLMContextRecall
 from ragas.metrics._factual_correctness import FactualCorrectness
 
+try:
+    import phoenix as px
+except ImportError:
+    px = None # Only needed for export_to_phoenix
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Metric Registry ---
+INSTRUCTION_CRITIC_DEFINITION = "Does the response accurately and completely follow all instructions, constraints (like length, format), and requests stated in the user query? Consider negative constraints (e.g., 'don't mention X'), guidelines (e.g., 'Write in 500 words')"
+
+# Builds each metric for a given evaluation model; the keys are the names results are reported under
+METRIC_FACTORIES = {
+    "faithfulness": lambda llm: Faithfulness(llm=llm),
+    "context_precision": lambda llm: LLMContextRecall(llm=llm),
+    "groundedness": lambda llm: ResponseGroundedness(llm=llm),
+    "factual_correctness": lambda llm: FactualCorrectness(llm=llm),
+    "instruction_critic": lambda llm: AspectCritic(name="instruction_following", definition=INSTRUCTION_CRITIC_DEFINITION, llm=llm),
+}
+METRIC_NAMES = list(METRIC_FACTORIES)
+# Bump a metric's version whenever its definition or configuration changes, so cached scores are not reused
+METRIC_VERSIONS = {metric_name: "1" for metric_name in METRIC_NAMES}
+DEFAULT_METRIC_TIMEOUT = 120.0 # Seconds a single metric may take before it is given up on
+
+
+class MetricRegistry:
+    """
+    Builds each ragas metric once per evaluation model and hands the same objects to every
+    sample, so prompts and metric setup are not rebuilt per sample. Metric objects only hold
+    configuration, which makes sharing them between concurrent tasks safe; the lock only guards
+    building them from several threads.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Any]] = None):
+        self.factories = dict(factories or METRIC_FACTORIES)
+        self._metrics: Dict[Tuple[int, str], Any] = {}
+        self._models: Dict[int, Any] = {} # Keeps models alive so their id() is never reused
+        self._lock = threading.Lock()
+
+    def get_metrics(self, evaluation_model=None, metric_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Returns the metric objects for the given evaluation model, building missing ones.
+
+        Args:
+            evaluation_model: LLM the metrics use as judge.
+            metric_names: Metrics to compute, defaults to all registered metrics.
+        """
+        metric_names = list(metric_names or self.factories)
+        unknown = [name for name in metric_names if name not in self.factories]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}, choose from {list(self.factories)}")
+
+        model_key = id(evaluation_model)
+        with self._lock:
+            self._models[model_key] = evaluation_model
+            for name in metric_names:
+                if (model_key, name) not in self._metrics:
+                    self._metrics[model_key, name] = self.factories[name](evaluation_model)
+            return {name: self._metrics[model_key, name] for name in metric_names}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._models.clear()
+
+
+METRIC_REGISTRY = MetricRegistry()
+
+
+# --- Evaluation Result Cache ---
+def judge_identity(evaluation_model) -> str:
+    """
+    Names the judge model behind an evaluation model, e.g. 'ChatOpenAI:gpt-4o', looking through
+    ragas' Langchain wrapper. Scores from different judges never share cache entries.
+    """
+    if evaluation_model is None:
+        return "none"
+    inner = getattr(evaluation_model, "langchain_llm", None) or getattr(evaluation_model, "llm", None) or evaluation_model
+    for attribute in ("model_name", "model", "model_id", "deployment_name"):
+        value = getattr(inner, attribute, None)
+        if isinstance(value, str) and value:
+            return f"{type(inner).__name__}:{value}"
+    return type(inner).__name__
+
+
+def sample_cache_key(reference: List[str], user_query: str, model_response: str, metric_name: str, judge: str) -> str:
+    """Hashes the sample content together with the metric, its version, the ragas version and the judge."""
+    payload = json.dumps({
+        "user_query": user_query,
+        "reference": list(reference),
+        "model_response": model_response,
+        "metric": metric_name,
+        "metric_version": METRIC_VERSIONS.get(metric_name, "1"),
+        "ragas_version": getattr(ragas, "__version__", "unknown"),
+        "judge": judge,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """
+    Persistent cache of metric scores keyed by sample_cache_key. Scores are appended to a JSON lines
+    file as they are computed, so an interrupted run keeps everything it already paid for.
+    Failed (None) scores are not cached and are retried on the next run.
+    """
+
+    def __init__(self, path: str = "evaluation_cache.jsonl"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._scores: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as cache_file:
+                for line in cache_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Partially written last line
+                    self._scores[entry["key"]] = entry["score"]
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def get(self, key: str) -> Optional[float]:
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def put(self, key: str, score: Optional[float], metric_name: str = "") -> None:
+        if score is None or pd.isna(score):
+            return
+        with self._lock:
+            if key in self._scores:
+                return
+            self._scores[key] = float(score)
+            with open(self.path, "a", encoding="utf-8") as cache_file:
+                cache_file.write(json.dumps({"key": key, "metric": metric_name, "score": float(score)}) + "\n")
+
+
 # --- Your Evaluation Function (Provided by User) ---
-async def evaluate_response(reference:List[str], user_query:str, model_response:str, evaluation_model = None):
-    """Calculates Ragas metrics for a given interaction."""
+
+async def score_metric(metric_name: str, metric, sample, timeout: Optional[float] = DEFAULT_METRIC_TIMEOUT,
+                       rate_limiter: Optional["AsyncRateLimiter"] = None) -> Optional[float]:
+    """
+    Scores one metric on one sample. A failing or timed out metric is logged and scored None
+    without affecting the other metrics of the sample. With a rate limiter, the judge call waits
+    for its turn first; the wait does not count against the timeout.
+    """
+    if rate_limiter is not None:
+        await rate_limiter.acquire()
+    try:
+        return await asyncio.wait_for(metric.single_turn_ascore(sample), timeout=timeout)
+    except asyncio.TimeoutError:
+        logging.error(f"Metric '{metric_name}' timed out after {timeout}s for query '{sample.user_input[:30]}...'")
+    except Exception as e:
+        logging.error(f"Metric '{metric_name}' failed for query '{sample.user_input[:30]}...': {e}")
+    return None
+
+
+async def evaluate_response(reference:List[str], user_query:str, model_response:str, evaluation_model = None,
+                            metric_timeout: Optional[float] = DEFAULT_METRIC_TIMEOUT,
+                            metric_names: Optional[List[str]] = None,
+                            registry: Optional[MetricRegistry] = None,
+                            cache: Optional[EvaluationCache] = None,
+                            rate_limiter: Optional["AsyncRateLimiter"] = None):
+    """
+    Calculates Ragas metrics for a given interaction.
+
+    The metrics are independent, so they run concurrently and the sample takes about as long as
+    its slowest metric. Each metric is isolated: one that fails or exceeds `metric_timeout`
+    seconds is None while the others keep their scores.
+
+    The metric objects come from `registry` (the shared METRIC_REGISTRY by default), so they are
+    built once per evaluation model; `metric_names` selects which metrics to compute.
+
+    With a `cache`, metrics already scored for the same sample content, metric version and judge
+    are taken from it and only the remaining ones call the judge.
+
+    With a `rate_limiter`, every metric that calls the judge acquires it once, so the limit counts
+    judge calls rather than samples; cached metrics do not use it up.
+    """
     # Added basic error handling for robustness
     metrics_result = {}
     try:
@@ -27,53 +213,199 @@ async def evaluate_response(reference:List[str], user_query:str, model_response:
             reference="\n".join(reference), # Assuming reference is also the ground truth reference
         )
 
-        # Initialize metrics (consider doing this once outside if evaluation_model is constant)
-        faithfulness = Faithfulness(llm=evaluation_model)
-        context_precision = LLMContextRecall(llm=evaluation_model)
-        groundedness = ResponseGroundedness(llm=evaluation_model)
-        factual_correctness = FactualCorrectness(llm=evaluation_model)
+        # Metrics are built once per evaluation model and reused across samples
+        metrics = (registry or METRIC_REGISTRY).get_metrics(evaluation_model, metric_names)
 
-        instruction_critic = AspectCritic(
-            name="instruction_following",
-            definition="Does the response accurately and completely follow all instructions, constraints (like length, format), and requests stated in the user query? Consider negative constraints (e.g., 'don't mention X'), guidelines (e.g., 'Write in 500 words')",
-            llm=evaluation_model
-        )
+    except Exception as e:
+        logging.error(f"Error creating Ragas sample or initializing metrics for query '{user_query[:30]}...': {e}")
+        # Return None for all metrics if sample creation fails
+        metrics_result = {metric_name: None for metric_name in (metric_names or METRIC_NAMES)}
+        return metrics_result
 
-        faithfulness_score = await faithfulness.single_turn_ascore(sample)
-        context_precision_score = await context_precision.single_turn_ascore(sample)
-        groundedness_score = await groundedness.single_turn_ascore(sample)
-        factual_correctness_score = await factual_correctness.single_turn_ascore(sample)
-        instruction_critic_score = await instruction_critic.single_turn_ascore(sample)
+    metrics_result = {}
+    cache_keys = {}
+    if cache is not None:
+        judge = judge_identity(evaluation_model)
+        for metric_name in list(metrics):
+            cache_keys[metric_name] = sample_cache_key(reference, user_query, model_response, metric_name, judge)
+            cached_score = cache.get(cache_keys[metric_name])
+            if cached_score is not None:
+                metrics_result[metric_name] = cached_score
+        metrics = {metric_name: metric for metric_name, metric in metrics.items() if metric_name not in metrics_result}
 
-        return {
-            "faithfulness": faithfulness_score,
-            "context_precision": context_precision_score,
-            "groundedness": groundedness_score,
-            "factual_correctness": factual_correctness_score,
-            "instruction_critic": instruction_critic_score
-        }
+    scores = await asyncio.gather(
+        *(score_metric(metric_name, metric, sample, metric_timeout, rate_limiter) for metric_name, metric in metrics.items())
+    )
+    for metric_name, score in zip(metrics.keys(), scores):
+        metrics_result[metric_name] = score
+        if cache is not None:
+            cache.put(cache_keys[metric_name], score, metric_name)
+    # Report metrics in the requested order, whether they came from the cache or the judge
+    return {metric_name: metrics_result[metric_name] for metric_name in (metric_names or METRIC_NAMES)}
 
 
-    except Exception as e:
-        logging.error(f"Error creating Ragas sample or initializing metrics for query '{user_query[:30]}...': {e}")
-        # Return None for all metrics if sample creation fails
-        metrics_result = {
-           "faithfulness": None, "context_precision": None,
-           "groundedness": None, "factual_correctness": None,
-           "instruction_critic": None
-        }
+# --- Statistical Comparison Function ---
+def metric_matrix(evaluation_results: Dict[str, List[Dict[str, Any]]], metric: str,
+                  system_ids: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collects one metric into a system x item matrix. Each row holds the valid (non-None, non-NaN)
+    scores of a system in ascending order, padded with NaN to the longest row.
+
+    Returns:
+        The score matrix and the number of valid scores per system.
+    """
+    rows = []
+    for sys_id in system_ids:
+        scores = pd.to_numeric(pd.Series([res.get(metric) for res in evaluation_results[sys_id]], dtype=object),
+                               errors="coerce").to_numpy(dtype=float)
+        rows.append(np.sort(scores[~np.isnan(scores)]))
+    counts = np.array([len(row) for row in rows])
+    matrix = np.full((len(rows), max(counts.max(initial=0), 1)), np.nan)
+    for index, row in enumerate(rows):
+        matrix[index, :len(row)] = row
+    return matrix, counts
+
+
+def pairwise_mannwhitney(matrix: np.ndarray, counts: np.ndarray, chunk_size: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-sided Mann-Whitney U tests of every system against every other in one batch.
+
+    Scores are replaced by their index among the distinct values. Walking the distinct values in
+    order, every score adds the number of scores of each other system below it (plus half the
+    ties) to its row of U, which is a sparse histogram times its running totals; the tie correction
+    follows from products of the same sparse histograms. Values are processed in chunks to bound
+    memory, so the cost grows with systems x scores rather than systems squared x distinct values. P-values use the normal approximation with tie and
+    continuity correction (scipy's asymptotic method).
 
-    return metrics_result
+    Returns:
+        The U statistics and p-values; entry [i, j] tests whether system i scores higher than j.
+        P-values are NaN where either system has no scores or all values are tied.
+    """
+    n_systems = len(counts)
+    valid = ~np.isnan(matrix)
+    rows = np.nonzero(valid)[0]
+    values, codes = np.unique(matrix[valid], return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    rows, codes = rows[order], codes[order]
+
+    u_stat = np.zeros((n_systems, n_systems))
+    cross = np.zeros((n_systems, n_systems)) # sum over values of h_i^2 * h_j
+    cubes = np.zeros(n_systems)
+    below = np.zeros(n_systems) # scores of each system below the current chunk
+    for chunk_start in range(0, len(values), chunk_size):
+        chunk_end = min(chunk_start + chunk_size, len(values))
+        lo, hi = np.searchsorted(codes, [chunk_start, chunk_end])
+        chunk_rows, chunk_codes = rows[lo:hi], codes[lo:hi] - chunk_start
+        # value x system counts, duplicate (value, system) entries are summed; float32 is exact below 2**24
+        dtype = np.float32 if hi - lo < 2 ** 24 else np.float64
+        counts_by_value = sparse.csr_matrix((np.ones(hi - lo, dtype=dtype), (chunk_codes, chunk_rows)),
+                                            shape=(chunk_end - chunk_start, n_systems))
+        hist = counts_by_value.T.tocsr()
+        # running totals of the scores of each system up to and including each value
+        running = counts_by_value.toarray()
+        np.cumsum(running, axis=0, out=running)
+        # every score adds the running totals at its value to its system's row of U, plus everything
+        # below the chunk, minus half of its ties, which the running totals fully include
+        scores_in_chunk = np.bincount(chunk_rows, minlength=n_systems)
+        u_stat += hist @ running + np.outer(scores_in_chunk, below) - 0.5 * (hist @ counts_by_value).toarray()
+        cross += (hist.multiply(hist) @ counts_by_value).toarray()
+        cubes += np.asarray(hist.power(3).sum(axis=1)).ravel()
+        below = below + running[-1]
+
+    n1, n2 = counts[:, None].astype(float), counts[None, :].astype(float)
+    total = n1 + n2
+    ties = cubes[:, None] + cubes[None, :] + 3 * (cross + cross.T) - total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1)))
+        z = (u_stat - n1 * n2 / 2 - 0.5) / np.sqrt(variance)
+        p_values = np.where((variance > 0) & (n1 > 0) & (n2 > 0), norm.sf(z), np.nan)
+    return u_stat, p_values
+
+
+def bootstrap_median_ci(matrix: np.ndarray, counts: np.ndarray, confidence: float = 0.95) -> np.ndarray:
+    """
+    Bootstrap percentile confidence intervals for the median of every system at once.
+
+    Instead of drawing resamples, the bootstrap distribution is evaluated exactly: the median of a
+    resample of n scores (the lower median for even n) is at most the j-th smallest score exactly
+    when at least ceil(n / 2) of the n draws land on the j smallest scores, a Binomial(n, j / n)
+    event. This is the limit of infinitely many resamples, at the cost of one binomial tail per score.
+
+    Returns:
+        An array of (lower, upper) bounds per system, NaN for systems without scores.
+    """
+    n_systems, width = matrix.shape
+    alpha = 1 - confidence
+    ranks = np.arange(1, width + 1)[None, :]
+    n = np.maximum(counts, 1)[:, None]
+    needed = np.ceil(n / 2)
+    cdf = binom.sf(needed - 1, n, np.minimum(ranks / n, 1.0))
+    cdf[ranks > counts[:, None]] = 1.0
+    lower = np.argmax(cdf >= alpha / 2, axis=1)
+    upper = np.argmax(cdf >= 1 - alpha / 2, axis=1)
+    bounds = np.stack([matrix[np.arange(n_systems), lower], matrix[np.arange(n_systems), upper]], axis=1)
+    bounds[counts == 0] = np.nan
+    return bounds
+
+
+def paired_scores(evaluation_results: Dict[str, List[Dict[str, Any]]], metric: str) -> pd.DataFrame:
+    """
+    Joins the systems' scores of one metric on the question they answered ('item_key').
+    Repeated answers of a system to the same question are averaged, so each question counts once.
+
+    Returns:
+        An item x system DataFrame, NaN where a system has no valid score for an item.
+    """
+    rows = [
+        {"item_key": res["item_key"], "system_id": sys_id, "score": res.get(metric)}
+        for sys_id, results in evaluation_results.items() for res in results
+        if res.get("item_key") is not None
+    ]
+    if not rows:
+        return pd.DataFrame()
+    frame = pd.DataFrame(rows)
+    frame["score"] = pd.to_numeric(frame["score"], errors="coerce")
+    return frame.pivot_table(index="item_key", columns="system_id", values="score", aggfunc="mean")
+
+
+def paired_wilcoxon(scores1: np.ndarray, scores2: np.ndarray, alternative: str = "greater") -> Tuple[float, int]:
+    """
+    Wilcoxon signed-rank test on the items both systems have scores for.
+
+    Returns:
+        The p-value (NaN if every paired difference is zero) and the number of pairs used.
+    """
+    both = ~np.isnan(scores1) & ~np.isnan(scores2)
+    differences = scores1[both] - scores2[both]
+    if not np.any(differences):
+        return float("nan"), int(both.sum())
+    return float(wilcoxon(differences, alternative=alternative, zero_method="wilcox").pvalue), int(both.sum())
 
 
-# --- Statistical Comparison Function (Unchanged Logic) ---
 def compare_systems(
     evaluation_results: Dict[str, List[Dict[str, Any]]],
-    alpha: float = 0.05
+    alpha: float = 0.05,
+    confidence: float = 0.95,
+    paired: bool = False
 ) -> Dict[str, Dict[str, Any]]:
     """
     Compares multiple systems based on evaluation metrics using statistical tests.
-    (Logic remains the same as it compares distributions independently)
+
+    For every metric the scores are held in a system x item matrix. The system with the highest
+    median is tested against every other system with a one-sided Mann-Whitney U test, and the
+    tests of all pairs are computed in one batch (see pairwise_mannwhitney). Each metric also
+    reports every system's median with its bootstrap confidence interval.
+
+    When all systems answer the same questions, `paired=True` joins them on the question and
+    tests the best system against each other one with a one-sided Wilcoxon signed-rank test on
+    the per-question differences instead. Removing the question-to-question variation needs far
+    fewer samples than the independent-sample test for the same power.
+
+    Args:
+        evaluation_results: Raw results per system, as returned by evaluate_systems_and_track.
+        alpha: Significance level of the tests.
+        confidence: Coverage of the median confidence intervals.
+        paired: Use paired Wilcoxon tests on the questions systems share.
     """
     if not evaluation_results:
         logging.warning("No evaluation results provided for comparison.")
@@ -96,7 +428,7 @@ def compare_systems(
     for results in valid_results.values():
         for res_dict in results:
             for k, v in res_dict.items():
-                if isinstance(v, (int, float)):
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
                     all_metric_keys.add(k)
 
     metric_keys = sorted(list(all_metric_keys))
@@ -112,203 +444,774 @@ def compare_systems(
             "comparison_details": {},
             "best_system": "N/A",
             "significantly_different": False,
-            "notes": ""
+            "notes": "",
+            "system_medians": {},
+            "median_ci": {},
+            "pairwise_p_values": None
         }
-        # Extract scores, explicitly handling None/NaN
-        metric_data = {}
-        for sys_id, results in valid_results.items():
-             scores = [res.get(metric) for res in results]
-             # Filter out None values before statistical analysis
-             valid_scores = [s for s in scores if s is not None and not pd.isna(s)]
-             metric_data[sys_id] = valid_scores
+        matrix, counts = metric_matrix(valid_results, metric, system_ids)
+        pairs = paired_scores(valid_results, metric) if paired else None
 
         # Check if any system has data for this metric
-        if not any(metric_data.values()):
-             comparison_summary[metric]["notes"] = "No valid data found for any system for this metric."
-             continue
-
-        system_medians = {}
-        for sys_id, scores in metric_data.items():
-             if scores:
-                 system_medians[sys_id] = statistics.median(scores)
-             else:
-                 # Keep track, but maybe don't calculate median
-                 system_medians[sys_id] = None # Explicitly None if no valid scores
-
-        # Find the system with the highest median score among those with scores
-        valid_medians = {k: v for k, v in system_medians.items() if v is not None}
-        if not valid_medians:
-            comparison_summary[metric]["notes"] = "No systems had valid scores to calculate a median."
+        if not counts.any():
+            comparison_summary[metric]["notes"] = "No valid data found for any system for this metric."
             continue
 
-        initial_best_sys = max(valid_medians, key=valid_medians.get)
-        highest_median_val = valid_medians[initial_best_sys]
-
-        # Compare the initial best against all *other* systems that have valid data
-        all_comparisons_significant = True
-        potential_competitors = [sid for sid in system_ids if sid != initial_best_sys and metric_data.get(sid)] # Only compare against systems with data
+        with np.errstate(all="ignore"):
+            medians = np.nanmedian(np.where(counts[:, None] > 0, matrix, np.nan), axis=1)
+        ci = bootstrap_median_ci(matrix, counts, confidence)
+        if not paired:
+            _, p_values = pairwise_mannwhitney(matrix, counts)
 
-        if not potential_competitors:
-             comparison_summary[metric]["best_system"] = initial_best_sys
-             comparison_summary[metric]["significantly_different"] = False # Cannot be significant if no competitors
-             comparison_summary[metric]["notes"] = f"{initial_best_sys} has the highest median ({highest_median_val:.3f}), but no other systems had valid data for comparison on this metric."
-             continue
+        system_medians = {sys_id: (float(medians[k]) if counts[k] else None) for k, sys_id in enumerate(system_ids)}
+        comparison_summary[metric]["system_medians"] = system_medians
+        comparison_summary[metric]["median_ci"] = {
+            sys_id: (tuple(float(bound) for bound in ci[k]) if counts[k] else None) for k, sys_id in enumerate(system_ids)
+        }
+        if not paired:
+            comparison_summary[metric]["pairwise_p_values"] = pd.DataFrame(p_values, index=system_ids, columns=system_ids)
 
+        # Find the system with the highest median score among those with scores
+        best = int(np.nanargmax(np.where(counts > 0, medians, -np.inf)))
+        initial_best_sys = system_ids[best]
+        highest_median_val = medians[best]
 
-        for other_sys_id in potential_competitors:
-            scores1 = metric_data[initial_best_sys]
-            scores2 = metric_data[other_sys_id]
+        # Compare the initial best against all *other* systems that have valid data
+        competitors = [k for k in range(len(system_ids)) if k != best and counts[k]]
+        if not competitors:
+            comparison_summary[metric]["best_system"] = initial_best_sys
+            comparison_summary[metric]["significantly_different"] = False # Cannot be significant if no competitors
+            comparison_summary[metric]["notes"] = f"{initial_best_sys} has the highest median ({highest_median_val:.3f}), but no other systems had valid data for comparison on this metric."
+            continue
 
+        all_comparisons_significant = True
+        for k in competitors:
+            pair = f"{initial_best_sys}_vs_{system_ids[k]}"
+            if paired:
+                scores1 = pairs[initial_best_sys].to_numpy() if initial_best_sys in pairs else np.array([])
+                scores2 = pairs[system_ids[k]].to_numpy() if system_ids[k] in pairs else np.array([])
+                p_value, n_pairs = paired_wilcoxon(scores1, scores2) if len(scores1) else (float("nan"), 0)
+                sizes = (n_pairs, n_pairs)
+            else:
+                p_value, sizes = p_values[best, k], (counts[best], counts[k])
             # Check sample size AFTER filtering None
-            if len(scores1) < 3 or len(scores2) < 3:
-                comparison_summary[metric]["comparison_details"][f"{initial_best_sys}_vs_{other_sys_id}"] = f"Insufficient data (need >=3 samples per group, got {len(scores1)} vs {len(scores2)})"
+            if min(sizes) < 3:
+                comparison_summary[metric]["comparison_details"][pair] = f"Insufficient data (need >=3 {'paired items' if paired else 'samples per group'}, got {sizes[0]} vs {sizes[1]})"
                 all_comparisons_significant = False
-                logging.warning(f"Skipping comparison for {metric} between {initial_best_sys} and {other_sys_id} due to insufficient valid data.")
+                logging.warning(f"Skipping comparison for {metric} between {initial_best_sys} and {system_ids[k]} due to insufficient valid data.")
                 continue
-
-            try:
-                # Test if scores1 > scores2 (one-sided Mann-Whitney U)
-                # This test assumes scores are continuous or ordinal.
-                stat, p_value = mannwhitneyu(scores1, scores2, alternative='greater', nan_policy='omit') # nan_policy='omit' might be redundant due to prior filtering
-
-                comparison_summary[metric]["comparison_details"][f"{initial_best_sys}_vs_{other_sys_id}"] = {
-                    "median_diff": highest_median_val - (system_medians.get(other_sys_id) if system_medians.get(other_sys_id) is not None else float('nan')),
-                    "p_value": p_value,
-                    "significant": p_value < alpha
-                }
-
-                if p_value >= alpha:
-                    all_comparisons_significant = False # Not significantly better than this competitor
-
-            except ValueError as e:
-                # Handle cases like all values being identical or other issues
-                logging.warning(f"Mann-Whitney U test failed for {metric} between {initial_best_sys} and {other_sys_id}: {e}")
-                comparison_summary[metric]["comparison_details"][f"{initial_best_sys}_vs_{other_sys_id}"] = f"Test failed: {e}"
+            if np.isnan(p_value):
+                reason = "all paired differences are zero" if paired else "all values are identical"
+                logging.warning(f"{'Wilcoxon' if paired else 'Mann-Whitney U'} test failed for {metric} between {initial_best_sys} and {system_ids[k]}: {reason}")
+                comparison_summary[metric]["comparison_details"][pair] = f"Test failed: {reason}"
                 all_comparisons_significant = False
+                continue
+
+            comparison_summary[metric]["comparison_details"][pair] = {
+                "median_diff": float(highest_median_val - medians[k]),
+                "p_value": float(p_value),
+                "significant": bool(p_value < alpha),
+                "test": "wilcoxon" if paired else "mannwhitneyu",
+                "n": int(min(sizes))
+            }
+            if p_value >= alpha:
+                all_comparisons_significant = False # Not significantly better than this competitor
 
         # Summarize findings
+        comparison_summary[metric]["best_system"] = initial_best_sys # Still has highest median
         if all_comparisons_significant:
-             comparison_summary[metric]["best_system"] = initial_best_sys
-             comparison_summary[metric]["significantly_different"] = True
-             comparison_summary[metric]["notes"] = f"{initial_best_sys} median ({highest_median_val:.3f}) is significantly higher than all other comparable systems (p < {alpha})."
+            comparison_summary[metric]["significantly_different"] = True
+            comparison_summary[metric]["notes"] = f"{initial_best_sys} median ({highest_median_val:.3f}) is significantly higher than all other comparable systems (p < {alpha})."
         else:
-             comparison_summary[metric]["best_system"] = initial_best_sys # Still has highest median
-             comparison_summary[metric]["significantly_different"] = False
-             comparison_summary[metric]["notes"] = f"{initial_best_sys} has the highest median ({highest_median_val:.3f}), but was not significantly higher than all comparable systems (alpha={alpha}). Check details."
+            comparison_summary[metric]["significantly_different"] = False
+            comparison_summary[metric]["notes"] = f"{initial_best_sys} has the highest median ({highest_median_val:.3f}), but was not significantly higher than all comparable systems (alpha={alpha}). Check details."
 
     return comparison_summary
 
 
+# --- Online Summaries ---
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P-square algorithm (Jain & Chlamtac, 1985): five
+    markers whose heights are adjusted with a piecewise-parabolic fit as values arrive, so memory
+    and time per value are constant. The first five values are kept and the quantile is exact.
+    """
+
+    def __init__(self, quantile: float):
+        if not 0 < quantile < 1:
+            raise ValueError(f"Quantile must be between 0 and 1, got {quantile}")
+        self.quantile = quantile
+        self.count = 0
+        self._heights: List[float] = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4]
+        self._increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        heights = self._heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        positions = self._positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in (1, 2, 3):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+                )
+                if not heights[i - 1] < height < heights[i + 1]:
+                    # Parabolic prediction out of order, fall back to linear interpolation
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+
+    @property
+    def value(self) -> float:
+        if self.count == 0:
+            return np.nan
+        if self.count <= 5:
+            return float(np.quantile(self._heights, self.quantile))
+        return self._heights[2]
+
+
+class OnlineMetricSummary:
+    """Running count, mean, spread and quartiles of one metric of one system, in constant memory."""
+
+    QUANTILES = (0.25, 0.5, 0.75)
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self._sum_squares = 0.0 # Welford's running sum of squared deviations
+        self.min = np.inf
+        self.max = -np.inf
+        self.quantiles = {q: P2Quantile(q) for q in self.QUANTILES}
+
+    def add(self, value: Optional[float]) -> None:
+        if value is None or pd.isna(value):
+            self.missing += 1
+            return
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._sum_squares += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for estimator in self.quantiles.values():
+            estimator.add(value)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._sum_squares / (self.count - 1)) if self.count > 1 else np.nan
+
+    @property
+    def median(self) -> float:
+        return self.quantiles[0.5].value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "missing": self.missing,
+            "mean": self.mean if self.count else np.nan,
+            "std": self.std,
+            "min": self.min if self.count else np.nan,
+            "p25": self.quantiles[0.25].value,
+            "median": self.median,
+            "p75": self.quantiles[0.75].value,
+            "max": self.max if self.count else np.nan,
+        }
+
+
+class OnlineSummaries:
+    """
+    Per-system, per-metric OnlineMetricSummary objects, fed with each result as it arrives from
+    evaluate_systems_and_track. Interim rankings can be taken at any point of the run.
+    """
+
+    def __init__(self):
+        self.summaries: Dict[Tuple[str, str], OnlineMetricSummary] = {}
+
+    def update(self, metrics: Dict[str, Any]) -> None:
+        """Adds one result dict, as produced by record_job."""
+        system_id = metrics.get("system_id")
+        for metric, value in metrics.items():
+            if metric in ("system_id", "prompt_tag", "item_key", "error"):
+                continue
+            if value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+                self.summaries.setdefault((system_id, metric), OnlineMetricSummary()).add(value)
+
+    def metrics(self) -> List[str]:
+        return sorted({metric for _, metric in self.summaries})
+
+    def ranking(self, metric: str, z: float = 1.96) -> pd.DataFrame:
+        """
+        Ranks the systems on the running median of a metric.
+
+        Args:
+            metric: Metric to rank on.
+            z: Normal quantile of the interval reported around each mean (1.96 for 95%).
+
+        Returns:
+            One row per system with the summary statistics and mean_low / mean_high, best first.
+        """
+        rows = {}
+        for (system_id, name), summary in self.summaries.items():
+            if name != metric:
+                continue
+            row = summary.as_dict()
+            margin = z * row["std"] / math.sqrt(summary.count) if summary.count > 1 else np.nan
+            row["mean_low"], row["mean_high"] = row["mean"] - margin, row["mean"] + margin
+            rows[system_id] = row
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame.from_dict(rows, orient="index").sort_values(["median", "mean"], ascending=False)
+
+    def leader(self, metric: str, z: float = 2.576, min_count: int = 30) -> Optional[str]:
+        """
+        Returns the system whose mean interval lies entirely above every other system's, once each
+        has at least min_count scores, or None while the ranking is still open. A long run can be
+        stopped when a leader is found for the metrics it is run for.
+        """
+        ranking = self.ranking(metric, z)
+        if len(ranking) < 2 or ranking["count"].min() < min_count:
+            return None
+        ranking = ranking.sort_values("mean_low", ascending=False)
+        best, others = ranking.iloc[0], ranking.iloc[1:]
+        return ranking.index[0] if best["mean_low"] > others["mean_high"].max() else None
+
+
+# --- Concurrency Helpers ---
+class AsyncRateLimiter:
+    """
+    Spaces out calls to one judge backend so that at most `rate` calls start per second.
+    Safe to share between tasks of one event loop.
+    """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.interval = 1.0 / rate
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_start - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_start = max(now, self._next_start) + self.interval
+
+
+def has_required_fields(data_point: Dict[str, Any]) -> bool:
+    """Checks that a data point has the 'user_query', 'reference' and 'model_response' an evaluation needs."""
+    return all([data_point.get('user_query'), data_point.get('reference'), data_point.get('model_response')])
+
+
+def plan_evaluations(
+    systems_config: Dict[str, Dict[str, Any]],
+    evaluation_data_per_system: Dict[str, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Flattens the per-system data into one job per (system, item), in the order the
+    serial loop would visit them. Results are collected in this order regardless of
+    which evaluation finishes first.
+    """
+    jobs = []
+    total_evals = sum(len(data) for data in evaluation_data_per_system.values())
+    eval_count = 0
+    for system_id, data_points in evaluation_data_per_system.items():
+        if system_id not in systems_config:
+            logging.warning(f"Skipping system '{system_id}' found in data but not in systems_config.")
+            continue
+
+        config = systems_config[system_id]
+        logging.info(f"--- Planning System: {system_id} ({len(data_points)} data points) ---")
+        for i, data_point in enumerate(data_points):
+            eval_count += 1
+            if not has_required_fields(data_point):
+                logging.warning(f"Skipping data point {i} for system {system_id} due to missing 'user_query', 'reference', or 'model_response'.")
+                continue
+            jobs.append({
+                "system_id": system_id,
+                "prompt_tag": config.get('prompt_tag', 'unknown'),
+                "judge_backend": config.get('judge_backend', 'default'),
+                "item_index": i,
+                "item_count": len(data_points),
+                "eval_count": eval_count,
+                "total_evals": total_evals,
+                "data_point": data_point,
+            })
+    return jobs
+
+
+def item_key(data_point: Dict[str, Any]) -> str:
+    """Identifies the question of a data point (query and reference), so systems can be paired on it."""
+    payload = json.dumps([data_point.get('user_query'), list(data_point.get('reference') or [])], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def sample_key(data_point: Dict[str, Any]) -> str:
+    """Identifies a (query, reference, response) triple regardless of which system produced it."""
+    payload = json.dumps([data_point.get('user_query'), list(data_point.get('reference') or []), data_point.get('model_response')],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def group_duplicate_jobs(jobs: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Groups planned jobs with identical samples, within and across systems. The judge only sees the
+    sample, so one evaluation per group yields the scores of every job in it.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        groups.setdefault(sample_key(job["data_point"]), []).append(job)
+    return groups
+
+
+def job_key(job: Dict[str, Any]) -> str:
+    """
+    Identifies a planned job across runs: the system, the item's position and its sample. An item
+    whose query, reference or response changed gets a new key and is evaluated again on resume.
+    """
+    return hashlib.sha256(f"{job['system_id']}\0{job['item_index']}\0{sample_key(job['data_point'])}".encode("utf-8")).hexdigest()
+
+
+# --- Result Log ---
+class ResultLog:
+    """
+    Append-only JSON lines log of evaluated jobs. Each job is written as soon as it is scored, with
+    the metrics kept for compare_systems and the Phoenix log entry, so a crashed run loses at most
+    the jobs still in flight. Jobs already in the log can be skipped when the run is resumed;
+    failed jobs, including jobs where any single metric failed or timed out, are logged too but
+    are not treated as done, so a resumed run retries them.
+    """
+
+    # Fields of a metrics dict that identify the job rather than score it
+    IDENTIFIER_FIELDS = ("system_id", "prompt_tag", "item_key", "error")
+
+    def __init__(self, path: str = "evaluation_results.jsonl"):
+        self.path = path
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        if os.path.exists(path):
+            for entry in self._iter_entries(path):
+                if self.is_complete(entry.get("metrics", {})):
+                    self._metrics[entry["job_key"]] = entry["metrics"]
+
+    @classmethod
+    def is_complete(cls, metrics: Dict[str, Any]) -> bool:
+        """A job is done when it did not fail and every requested metric has a score."""
+        return metrics.get("error") is None and all(
+            not pd.isna(value) for name, value in metrics.items() if name not in cls.IDENTIFIER_FIELDS
+        )
+
+    @staticmethod
+    def _iter_entries(path: str) -> Iterator[Dict[str, Any]]:
+        with open(path, encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue # Partially written last line
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._metrics)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._metrics
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the logged metrics of a completed job, or None."""
+        return self._metrics.get(key)
+
+    def append(self, key: str, metrics: Dict[str, Any], log_entry: Optional[Dict[str, Any]]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"job_key": key, "metrics": metrics, "log_entry": log_entry}, default=float) + "\n")
+        self._file.flush()
+        if self.is_complete(metrics):
+            self._metrics[key] = metrics
+
+    def iter_log_entries(self, chunk_size: int = 1000) -> Iterator[pd.DataFrame]:
+        """
+        Reads the Phoenix log entries back from disk, chunk_size rows at a time. Only the latest
+        entry of a job is kept when it was evaluated more than once, e.g. retried after a failure.
+        """
+        self.flush()
+        if not os.path.exists(self.path):
+            return
+        latest_line: Dict[str, int] = {}
+        for line_number, entry in enumerate(self._iter_entries(self.path)):
+            latest_line[entry["job_key"]] = line_number
+        chunk = []
+        for line_number, entry in enumerate(self._iter_entries(self.path)):
+            if entry.get("log_entry") is None or latest_line[entry["job_key"]] != line_number:
+                continue
+            chunk.append(entry["log_entry"])
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def export_to_phoenix(result_log: ResultLog, dataset_name: str, chunk_size: int = 1000, client=None) -> int:
+    """
+    Uploads the logged evaluations to a Phoenix dataset, one chunk at a time, so the run never has
+    to be held in memory. The first chunk creates the dataset and later chunks are appended to it.
+
+    Args:
+        result_log: The ResultLog the evaluations were written to.
+        dataset_name: Name of the Phoenix dataset to create.
+        chunk_size: Rows read from the log and uploaded per request.
+        client: Optional phoenix Client; defaults to px.Client().
+
+    Returns:
+        The number of rows uploaded.
+    """
+    if client is None:
+        if px is None:
+            raise ImportError("Exporting to Phoenix requires the arize-phoenix package")
+        client = px.Client()
+    uploaded = 0
+    for chunk in result_log.iter_log_entries(chunk_size):
+        keys = {
+            "input_keys": ["user_query"],
+            "output_keys": ["model_response"],
+            "metadata_keys": [column for column in chunk.columns if column not in ("user_query", "model_response")],
+        }
+        if uploaded == 0:
+            client.upload_dataset(dataframe=chunk, dataset_name=dataset_name, **keys)
+        else:
+            client.append_to_dataset(dataframe=chunk, dataset_name=dataset_name, **keys)
+        uploaded += len(chunk)
+        logging.info(f"Exported {uploaded} evaluations to Phoenix dataset '{dataset_name}'")
+    return uploaded
+
+
 # --- Modified Evaluation and Tracking Function ---
+async def score_job(job: Dict[str, Any], evaluation_llm=None, cache: Optional[EvaluationCache] = None,
+                    registry: Optional[MetricRegistry] = None,
+                    rate_limiter: Optional[AsyncRateLimiter] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Scores the sample of one planned job with evaluate_response. Without an evaluation LLM
+    the scores are simulated and no judge is called, so the rate limiter is not used.
+
+    Returns:
+        The metric scores and None, or None and the error message if the evaluation failed.
+    """
+    system_id, i, eval_count = job["system_id"], job["item_index"], job["eval_count"]
+    data_point = job["data_point"]
+    logging.info(f"Processing {system_id} - item {i+1}/{job['item_count']} (Total {eval_count}/{job['total_evals']})")
+
+    # --- Evaluate Response ---
+    try:
+        if evaluation_llm is not None:
+            scores = await evaluate_response(
+                reference=data_point.get('reference'),
+                user_query=data_point.get('user_query'),
+                model_response=data_point.get('model_response'),
+                evaluation_model=evaluation_llm, # Pass the Ragas evaluation LLM
+                registry=registry,
+                cache=cache,
+                rate_limiter=rate_limiter
+            )
+        else:
+            await asyncio.sleep(0.1) # Simulate async work
+            scores = {
+                "faithfulness": random.uniform(0.6, 1.0),
+                "context_precision": random.uniform(0.5, 0.95),
+                "groundedness": random.uniform(0.7, 1.0),
+                "factual_correctness": random.uniform(0.65, 0.98),
+            }
+        return scores, None
+    except Exception as e:
+        logging.error(f"Failed evaluation for system {system_id} on item {i}: {e}", exc_info=True)
+        return None, str(e)
+
+
+def record_job(job: Dict[str, Any], scores: Optional[Dict[str, Any]],
+               error: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Turns the scores of a job's sample into the metrics dict stored for the comparison function
+    and the Phoenix log entry (None if nothing should be logged).
+    """
+    system_id, prompt_tag, eval_count = job["system_id"], job["prompt_tag"], job["eval_count"]
+    if scores is None:
+        # Store error information if needed
+        return {
+            "system_id": system_id,
+            "prompt_tag": prompt_tag,
+            "item_key": item_key(job["data_point"]),
+            "error": error,
+            "faithfulness": None, "context_precision": None, # Ensure keys exist for comparison fn
+            "groundedness": None, "factual_correctness": None
+        }, None
+
+    # Add identifiers to the results dict *before* storing/logging
+    metrics = dict(scores)
+    metrics['system_id'] = system_id
+    metrics['prompt_tag'] = prompt_tag
+    metrics['item_key'] = item_key(job["data_point"])
+
+    # --- Prepare data for Phoenix ---
+    # Only log rows where metrics calculation didn't completely fail
+    if not any(v is not None for k, v in metrics.items() if k not in ['system_id', 'prompt_tag', 'item_key']):
+        logging.warning(f"Skipping Phoenix logging for run {eval_count} (system {system_id}) as all metrics were None.")
+        return metrics, None
+
+    log_entry = {
+        # Identifiers
+        "run_id": f"run_{datetime.now().strftime('%Y%m%d%H%M%S')}_{eval_count}", # Unique ID
+        "system_id": system_id,
+        "prompt_tag": prompt_tag,
+        # Inputs / Outputs (log references if not too large/sensitive)
+        "user_query": job["data_point"].get('user_query'),
+        # "reference_context": "\n".join(reference), # Example: Log context if needed
+        "model_response": job["data_point"].get('model_response'),
+        # Metrics (flatten the dict, prefix, handle None)
+        **{f"metric_{k}": (float(v) if v is not None else None)
+           for k, v in metrics.items()
+           if k not in ['system_id', 'prompt_tag', 'item_key'] and isinstance(v, (int, float, type(None)))} # Filter system_id/tag and ensure numeric/None
+    }
+    return metrics, log_entry
+
+
+async def evaluate_job(job: Dict[str, Any], evaluation_llm=None, cache: Optional[EvaluationCache] = None,
+                       registry: Optional[MetricRegistry] = None,
+                       rate_limiter: Optional[AsyncRateLimiter] = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Scores and records one planned (system, item) job, see score_job and record_job."""
+    return record_job(job, *await score_job(job, evaluation_llm, cache, registry, rate_limiter))
+
+
 async def evaluate_systems_and_track(
     systems_config: Dict[str, Dict[str, Any]], # Key: system_id, Value: {'llm_model': obj, 'prompt_tag': str} - NO prompt_text needed here
     evaluation_data_per_system: Dict[str, List[Dict[str, Any]]], # Key: system_id, Value: List of {'user_query': str, 'reference': List[str], 'model_response': str}
-    evaluation_llm=None # The LLM used by Ragas evaluate_response function
+    evaluation_llm=None, # The LLM used by Ragas evaluate_response function
+    max_concurrency: int = 1,
+    rate_limits: Optional[Dict[str, float]] = None,
+    cache: Optional[EvaluationCache] = None,
+    deduplicate: bool = True,
+    result_log: Optional[ResultLog] = None,
+    resume: bool = False,
+    summaries: Optional[OnlineSummaries] = None,
+    registry: Optional[MetricRegistry] = None
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
-    Runs evaluations for multiple systems using provided data for each, logs to Phoenix.
+    Runs evaluations for multiple systems using provided data for each, optionally logging every
+    evaluated item to a ResultLog as it completes (see export_to_phoenix).
 
     Args:
         systems_config: Dictionary defining system configurations (like model client, tags).
              Example: { "gpt4_prompt_v1": {"llm_model": gpt4_client, "prompt_tag": "v1"} }
                      (Note: 'llm_model' here is the one being *evaluated*, not the Ragas evaluation_llm)
+             An optional 'judge_backend' names the judge endpoint the system's evaluations go to
+             (defaults to 'default'), which is what `rate_limits` refers to.
         evaluation_data_per_system: Dictionary where keys are system_ids matching systems_config,
             and values are lists of evaluation data points for that system. Each data point is a dict:
             {'user_query': str, 'reference': List[str], 'model_response': str}
         evaluation_llm: Model used by the Ragas evaluate_response function itself.
+        max_concurrency: Maximum number of (system, item) evaluations in flight at once.
+            1 evaluates one item after another.
+        rate_limits: Optional maximum judge calls per second per judge backend. Each metric evaluation
+            sent to the judge counts once; cached metrics and duplicate samples do not count.
+        cache: Optional EvaluationCache; unchanged samples are not sent to the judge again.
+        deduplicate: Evaluate identical (query, reference, response) triples only once, within and
+            across systems. Their scores are copied to every occurrence, so each occurrence still
+            counts once in compare_systems, exactly as without deduplication.
+        result_log: Optional ResultLog every job is appended to as soon as it is scored.
+        resume: Take jobs already completed in result_log from the log instead of evaluating them again.
+            Jobs with an error or with any metric that failed or timed out (None) are evaluated
+            again; with a cache only their missing metrics call the judge.
+            Off by default: only resume a log written for the same data and metrics.
+        summaries: Optional OnlineSummaries updated with every result as it arrives, so interim rankings
+            can be read while the run is in progress.
+        registry: Optional MetricRegistry the metric objects come from, METRIC_REGISTRY by default.
 
     Returns:
-        A dictionary containing the raw evaluation metric results for each system.
+        A dictionary containing the raw evaluation metric results for each system, in the
+        order of the input data regardless of completion order.
     """
     all_results = {sys_id: [] for sys_id in systems_config.keys()}
-    phoenix_data = []
-    total_evals = sum(len(data) for data in evaluation_data_per_system.values())
-    eval_count = 0
+    jobs = plan_evaluations(systems_config, evaluation_data_per_system)
+    metrics_by_job: Dict[int, Dict[str, Any]] = {}
+    keys = {id(job): job_key(job) for job in jobs} if result_log is not None else {}
 
-    # --- Evaluation Loop ---
-    for system_id, data_points in evaluation_data_per_system.items():
-        if system_id not in systems_config:
-            logging.warning(f"Skipping system '{system_id}' found in data but not in systems_config.")
-            continue
+    pending = jobs
+    if result_log is not None and resume:
+        for job in jobs:
+            logged = result_log.get(keys[id(job)])
+            if logged is not None:
+                metrics_by_job[id(job)] = logged
+                if summaries is not None:
+                    summaries.update(logged)
+        pending = [job for job in jobs if id(job) not in metrics_by_job]
+        if len(pending) < len(jobs):
+            logging.info(f"Resuming: {len(jobs) - len(pending)} of {len(jobs)} evaluations taken from {result_log.path}")
 
-        config = systems_config[system_id]
-        prompt_tag = config.get('prompt_tag', 'unknown') # Get tag from config
-        # llm_model_client = config.get('llm_model', None) # Client of the model *being* evaluated (useful for logging tags/metadata)
+    groups = group_duplicate_jobs(pending) if deduplicate else {str(index): [job] for index, job in enumerate(pending)}
+    if deduplicate and len(groups) < len(pending):
+        logging.info(f"Collapsed {len(pending)} evaluations to {len(groups)} unique samples")
 
-        logging.info(f"--- Evaluating System: {system_id} ({len(data_points)} data points) ---")
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    limiters = {backend: AsyncRateLimiter(rate) for backend, rate in (rate_limits or {}).items()}
 
-        for i, data_point in enumerate(data_points):
-            eval_count += 1
-            user_query = data_point.get('user_query')
-            reference = data_point.get('reference')
-            model_response = data_point.get('model_response')
+    async def run(group: List[Dict[str, Any]]):
+        async with semaphore:
+            # The limiter is acquired per judge call inside evaluate_response, not per job
+            scores, error = await score_job(group[0], evaluation_llm, cache, registry, limiters.get(group[0]["judge_backend"]))
+        # Fan the scores out to every occurrence and log them as soon as they are known
+        for job in group:
+            metrics, log_entry = record_job(job, scores, error)
+            metrics_by_job[id(job)] = metrics
+            if summaries is not None:
+                summaries.update(metrics)
+            if result_log is not None:
+                result_log.append(keys[id(job)], metrics, log_entry)
 
-            if not all([user_query, reference, model_response]):
-                logging.warning(f"Skipping data point {i} for system {system_id} due to missing 'user_query', 'reference', or 'model_response'.")
-                continue
+    await asyncio.gather(*(run(group) for group in groups.values()))
 
-            logging.info(f"Processing {system_id} - item {i+1}/{len(data_points)} (Total {eval_count}/{total_evals})")
-
-            # --- Evaluate Response ---
-            try:
-                # *** Call your ACTUAL evaluate_response function ***
-                # metrics = await evaluate_response(
-                #     reference=reference,
-                #     user_query=user_query,
-                #     model_response=model_response,
-                #     evaluation_model=evaluation_llm # Pass the Ragas evaluation LLM
-                # )
-
-                await asyncio.sleep(0.1) # Simulate async work
-                metrics = {
-                    "faithfulness": random.uniform(0.6, 1.0),
-                    "context_precision": random.uniform(0.5, 0.95),
-                    "groundedness": random.uniform(0.7, 1.0),
-                    "factual_correctness": random.uniform(0.65, 0.98),
-                }
-
-                # Add identifiers to the results dict *before* storing/logging
-                metrics['system_id'] = system_id
-                metrics['prompt_tag'] = prompt_tag
-                # Store raw results for the comparison function
-                all_results[system_id].append(metrics)
-
-                # --- Prepare data for Phoenix ---
-                # Only log rows where metrics calculation didn't completely fail
-                if any(v is not None for k, v in metrics.items() if k not in ['system_id', 'prompt_tag']):
-                    log_entry = {
-                        # Identifiers
-                        "run_id": f"run_{datetime.now().strftime('%Y%m%d%H%M%S')}_{eval_count}", # Unique ID
-                        "system_id": system_id,
-                        "prompt_tag": prompt_tag,
-                        # Inputs / Outputs (log references if not too large/sensitive)
-                        "user_query": user_query,
-                        # "reference_context": "\n".join(reference), # Example: Log context if needed
-                        "model_response": model_response,
-                        # Metrics (flatten the dict, prefix, handle None)
-                        **{f"metric_{k}": (float(v) if v is not None else None)
-                           for k, v in metrics.items()
-                           if k not in ['system_id', 'prompt_tag'] and isinstance(v, (int, float, type(None)))} # Filter system_id/tag and ensure numeric/None
-                    }
-                    phoenix_data.append(log_entry)
-                else:
-                     logging.warning(f"Skipping Phoenix logging for run {eval_count} (system {system_id}) as all metrics were None.")
-
-
-            except Exception as e:
-                logging.error(f"Failed evaluation for system {system_id} on item {i}: {e}", exc_info=True)
-                # Store error information if needed
-                all_results[system_id].append({
-                    "system_id": system_id,
-                    "prompt_tag": prompt_tag,
-                    "error": str(e),
-                    "faithfulness": None, "context_precision": None, # Ensure keys exist for comparison fn
-                    "groundedness": None, "factual_correctness": None
-                })
+    # Store raw results for the comparison function, in plan order rather than completion order
+    for job in jobs:
+        all_results[job["system_id"]].append(metrics_by_job[id(job)])
 
     return all_results
 
 
+# --- Sequential Evaluation ---
+async def evaluate_systems_sequentially(
+    systems_config: Dict[str, Dict[str, Any]],
+    evaluation_data_per_system: Dict[str, List[Dict[str, Any]]],
+    evaluation_llm=None,
+    metric: str = "faithfulness",
+    batch_size: int = 10,
+    alpha: float = 0.05,
+    min_pairs: int = 6,
+    **evaluation_kwargs
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Evaluates the systems question by question in rounds and stops spending judge calls on a
+    system once its ranking against every other system is settled.
+
+    Each round evaluates the next `batch_size` questions for every system that still has an
+    unsettled pair. After the round each unsettled pair is compared with a two-sided paired
+    Wilcoxon test on `metric`. A pair is settled when p falls below alpha divided by the number
+    of planned looks times the number of pairs (a Bonferroni split of alpha over the repeated
+    looks and the pairs, which keeps the family-wise error rate of the whole ranking at alpha
+    despite testing every pair after every round).
+
+    Args:
+        systems_config: As for evaluate_systems_and_track.
+        evaluation_data_per_system: As for evaluate_systems_and_track; systems are paired on the
+            questions (query and reference) they share.
+        evaluation_llm: Model used by the Ragas evaluate_response function itself.
+        metric: Metric the ranking is decided on.
+        batch_size: Questions evaluated per round.
+        alpha: Family-wise significance level over all pairs and rounds.
+        min_pairs: Paired questions needed before a pair is tested.
+        evaluation_kwargs: Passed on to evaluate_systems_and_track (max_concurrency, cache, ...).
+
+    Returns:
+        The raw results per system, as from evaluate_systems_and_track, and a summary with the
+        settled pairs, the number of rounds, the alpha each test was held to, and the number of
+        (system, question) evaluations that were run and that early stopping skipped. Evaluations
+        that were run include those answered by the cache, deduplication or a resumed log, so
+        they are an upper bound on the judge calls spent, not a count of them.
+    """
+    systems = [sys_id for sys_id in evaluation_data_per_system if sys_id in systems_config]
+    # Questions in order of first appearance, and where each system answers them
+    questions: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for sys_id in systems:
+        for data_point in evaluation_data_per_system[sys_id]:
+            questions.setdefault(item_key(data_point), {}).setdefault(sys_id, []).append(data_point)
+    question_keys = list(questions)
+
+    max_looks = max(1, math.ceil(len(question_keys) / max(1, batch_size)))
+    unsettled = {(a, b) for n, a in enumerate(systems) for b in systems[n + 1:]}
+    look_alpha = alpha / (max_looks * max(1, len(unsettled)))
+    settled: Dict[str, Dict[str, Any]] = {}
+    all_results: Dict[str, List[Dict[str, Any]]] = {sys_id: [] for sys_id in systems_config}
+    rounds = 0
+
+    for start in range(0, len(question_keys), max(1, batch_size)):
+        active = {sys_id for pair in unsettled for sys_id in pair}
+        if not active:
+            break
+        rounds += 1
+        batch = question_keys[start:start + batch_size]
+        round_data = {
+            sys_id: [data_point for key in batch for data_point in questions[key].get(sys_id, [])]
+            for sys_id in systems if sys_id in active
+        }
+        round_results = await evaluate_systems_and_track(
+            {sys_id: systems_config[sys_id] for sys_id in round_data}, round_data, evaluation_llm, **evaluation_kwargs
+        )
+        for sys_id, results in round_results.items():
+            all_results[sys_id].extend(results)
+
+        pairs = paired_scores(all_results, metric)
+        for a, b in sorted(unsettled):
+            if a not in pairs or b not in pairs:
+                continue
+            p_value, n_pairs = paired_wilcoxon(pairs[a].to_numpy(), pairs[b].to_numpy(), alternative="two-sided")
+            if n_pairs < min_pairs or np.isnan(p_value) or p_value >= look_alpha:
+                continue
+            difference = float(np.nanmedian(pairs[a].to_numpy() - pairs[b].to_numpy()))
+            winner, loser = (a, b) if difference > 0 else (b, a)
+            settled[f"{winner}_vs_{loser}"] = {"better": winner, "p_value": p_value, "n_pairs": n_pairs, "round": rounds}
+            unsettled.discard((a, b))
+            logging.info(f"Settled {winner} > {loser} on {metric} after {n_pairs} paired questions (p={p_value:.4g})")
+
+    evaluations_run = sum(len(results) for results in all_results.values())
+    planned_evaluations = sum(len(evaluation_data_per_system[sys_id]) for sys_id in systems)
+    summary = {
+        "metric": metric,
+        "settled": settled,
+        "unsettled": [f"{a}_vs_{b}" for a, b in sorted(unsettled)],
+        "rounds": rounds,
+        "alpha_per_test": look_alpha,
+        "evaluations_run": evaluations_run,
+        "evaluations_skipped": planned_evaluations - evaluations_run,
+    }
+    return all_results, summary
+
+
 # --- Example Usage ---
 async def main():
     # Define system configurations (placeholders for actual LLM clients used for generation)
@@ -347,13 +1250,28 @@ async def main():
 
 
     # --- Run Evaluations and Track ---
+    # Every evaluated item is appended to this run's log. To finish an interrupted run, open its log
+    # again and pass resume=True, so only the missing items are evaluated
+    result_log = ResultLog(f"evaluation_results_{datetime.now().strftime('%Y%m%d%H%M%S')}.jsonl")
+    # Running medians and quartiles, readable while the evaluations are still in flight
+    summaries = OnlineSummaries()
     raw_results = await evaluate_systems_and_track(
         systems_config=systems_config,
         evaluation_data_per_system=evaluation_data,
-        evaluation_llm=ragas_evaluation_llm
+        evaluation_llm=ragas_evaluation_llm,
+        max_concurrency=16,
+        rate_limits={"default": 50.0},
+        cache=EvaluationCache("evaluation_cache.jsonl"),
+        result_log=result_log,
+        summaries=summaries
     )
 
+    print("\n--- Running Summary (faithfulness) ---")
+    print(summaries.ranking("faithfulness").to_string())
+
     # --- Perform Statistical Comparison ---
+    # The example has only a few distinct questions per system, too few for the paired test.
+    # With many shared questions, compare_systems(raw_results, paired=True) needs fewer of them.
     comparison_report = compare_systems(raw_results)
 
     print("\n--- Statistical Comparison Report ---")
@@ -363,6 +1281,9 @@ async def main():
             print(f"  Best Performing System (Highest Median): {result.get('best_system', 'N/A')}")
             print(f"  Significantly Better than ALL others?: {result.get('significantly_different', False)}")
             print(f"  Notes: {result.get('notes', '')}")
+            for sys_id, ci in result.get('median_ci', {}).items():
+                if ci is not None:
+                    print(f"    {sys_id}: median {result['system_medians'][sys_id]:.3f} (95% CI {ci[0]:.3f} - {ci[1]:.3f})")
             # Uncomment to see pairwise details:
             # print(f"  Comparison Details: {result.get('comparison_details', {})}")
     else:
@@ -370,5 +1291,9 @@ async def main():
 
     print("\n--- End of Report ---")
 
+    if px is not None:
+        export_to_phoenix(result_log, dataset_name=f"evaluation_{datetime.now().strftime('%Y%m%d%H%M%S')}")
+    result_log.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
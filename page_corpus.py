@@ -0,0 +1,256 @@
+"""
+
+Saved-HTML fixture corpus for the page detectors in check_popup.py and the
+link finders in crawler.py.
+
+``record`` fetches pages once and stores them in a compressed zip corpus
+together with a manifest. ``replay`` runs every registered detector over the
+corpus without touching the network and reports per-detector latency, peak
+memory and agreement with the labelled outputs stored in the manifest.
+``replay --save-labels`` stores the current outputs as labels, which can then
+be reviewed and corrected by hand.
+
+Usage:
+    python page_corpus.py record corpus.zip https://www.cnn.com/ https://www.npr.org/
+    python page_corpus.py replay corpus.zip --repeat 5
+
+"""
+
+import argparse
+import hashlib
+import json
+import statistics
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+from check_popup import BROWSER_HEADERS, analyze_html, detect_popup_indicators, scan_popups_incremental
+from crawler import find_terms_of_use_link, get_about_us_url
+from page_encoding import decode_html
+
+MANIFEST_NAME = "manifest.json"
+
+
+def page_key(url):
+    """Stable file name for a URL inside the corpus."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+# Every detector takes the raw page bytes, the page URL and the recorded
+# Content-Type header, and returns a JSON-serialisable value that is compared
+# against the labels. Pages are decoded with the recorded header, as the live
+# crawl decodes them.
+DETECTORS = {
+    "popups": lambda content, url, content_type: bool(detect_popup_indicators(decode_html(content, content_type))),
+    "popups_incremental": lambda content, url, content_type: scan_popups_incremental(
+        [content], content_type=content_type)["has_popups"],
+    "interaction": lambda content, url, content_type: bool(analyze_html(decode_html(content, content_type))["interaction"]),
+    "aria_roles": lambda content, url, content_type: sorted(
+        {finding["role"] for finding in analyze_html(decode_html(content, content_type))["roles"]}),
+    "about_us_url": lambda content, url, content_type: get_about_us_url(decode_html(content, content_type), url),
+    "terms_of_use_url": lambda content, url, content_type: find_terms_of_use_link(decode_html(content, content_type), url),
+}
+
+
+def load_corpus(corpus_path):
+    """
+    Reads a corpus.
+
+    Returns:
+        tuple: The manifest (a list of page entries) and a dict mapping page
+               keys to raw HTML bytes.
+    """
+    corpus_path = Path(corpus_path)
+    if not corpus_path.exists():
+        return [], {}
+    with zipfile.ZipFile(corpus_path) as corpus:
+        manifest = json.loads(corpus.read(MANIFEST_NAME))
+        pages = {entry["key"]: corpus.read(f"pages/{entry['key']}.html") for entry in manifest}
+    return manifest, pages
+
+
+def save_corpus(corpus_path, manifest, pages):
+    """Writes the manifest and pages to a new compressed zip file."""
+    corpus_path = Path(corpus_path)
+    temp_path = corpus_path.with_suffix(corpus_path.suffix + ".tmp")
+    with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_LZMA) as corpus:
+        corpus.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+        for key, content in pages.items():
+            corpus.writestr(f"pages/{key}.html", content)
+    temp_path.replace(corpus_path)
+
+
+def record_pages(urls, corpus_path, refresh=False):
+    """
+    Downloads pages into the corpus. Pages already present are kept unless
+    ``refresh`` is set, so that their labels stay valid.
+
+    Args:
+        urls (list): Pages to snapshot.
+        corpus_path (str): Zip file holding the corpus.
+        refresh (bool): Download pages again even if they are in the corpus.
+
+    Returns:
+        list: The updated manifest.
+    """
+    manifest, pages = load_corpus(corpus_path)
+    entries = {entry["url"]: entry for entry in manifest}
+    for url in urls:
+        if url in entries and not refresh:
+            continue
+        try:
+            response = requests.get(url, headers=BROWSER_HEADERS, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching URL: {e}")
+            continue
+        key = page_key(url)
+        pages[key] = response.content
+        entries[url] = {
+            "url": url,
+            "key": key,
+            "final_url": response.url,
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "bytes": len(response.content),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "labels": entries.get(url, {}).get("labels", {}),
+        }
+        print(f"Recorded {url} ({len(response.content)} bytes)")
+    manifest = list(entries.values())
+    save_corpus(corpus_path, manifest, pages)
+    return manifest
+
+
+def run_detector(detector, content, url, content_type=None, repeat=1):
+    """
+    Times one detector on one page.
+
+    The first call runs under tracemalloc to measure peak Python memory; the
+    timed calls run without it, since tracing slows allocation down.
+
+    Returns:
+        tuple: The detector output, the list of timings in seconds and the peak
+               traced memory in bytes.
+    """
+    tracemalloc.start()
+    output = detector(content, url, content_type)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        detector(content, url, content_type)
+        timings.append(time.perf_counter() - started)
+    return output, timings, peak
+
+
+def replay(corpus_path, detectors=None, repeat=3, save_labels=False):
+    """
+    Runs detectors over every page in the corpus offline.
+
+    Args:
+        corpus_path (str): Zip file holding the corpus.
+        detectors (list, optional): Names from DETECTORS. Defaults to all.
+        repeat (int): Timed runs per page and detector.
+        save_labels (bool): Store the outputs as labels for pages and
+            detectors that have none yet.
+
+    Returns:
+        tuple: A per-detector summary DataFrame and a per-page DataFrame.
+    """
+    manifest, pages = load_corpus(corpus_path)
+    names = detectors or list(DETECTORS)
+    rows = []
+    for entry in manifest:
+        content = pages[entry["key"]]
+        for name in names:
+            try:
+                output, timings, peak = run_detector(
+                    DETECTORS[name], content, entry["url"], entry.get("content_type"), repeat
+                )
+                error = None
+            except Exception as e:
+                output, timings, peak, error = None, [], 0, str(e)
+            labelled = name in entry["labels"]
+            label = entry["labels"].get(name)
+            rows.append({
+                "detector": name,
+                "url": entry["url"],
+                "bytes": len(content),
+                "output": output,
+                "label": label,
+                "agrees": output == label if labelled and error is None else None,
+                "median_ms": statistics.median(timings) * 1000 if timings else None,
+                "peak_kb": peak / 1024,
+                "error": error,
+            })
+            if save_labels and error is None and not labelled:
+                entry["labels"][name] = output
+
+    if save_labels:
+        save_corpus(corpus_path, manifest, pages)
+
+    per_page = pd.DataFrame(rows)
+    if per_page.empty:
+        return per_page, per_page
+    summary = per_page.groupby("detector").agg(
+        pages=("url", "count"),
+        errors=("error", lambda errors: errors.notna().sum()),
+        mean_ms=("median_ms", "mean"),
+        p95_ms=("median_ms", lambda timings: timings.quantile(0.95)),
+        bytes=("bytes", "sum"),
+        peak_kb=("peak_kb", "max"),
+        labelled=("agrees", lambda agrees: agrees.notna().sum()),
+        agreement=("agrees", lambda agrees: agrees.dropna().astype(float).mean()),
+    )
+    total_seconds = per_page.groupby("detector")["median_ms"].sum() / 1000
+    summary["mb_per_s"] = summary["bytes"] / 1024 / 1024 / total_seconds
+    return summary.reindex(names), per_page
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Record and replay the saved-HTML detector corpus")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Snapshot pages into the corpus")
+    record.add_argument("corpus", help="Corpus zip file")
+    record.add_argument("urls", nargs="*", help="Pages to record")
+    record.add_argument("--urls-file", default=None, help="File with one URL per line")
+    record.add_argument("--refresh", action="store_true", help="Download pages that are already recorded again")
+
+    replay_parser = subparsers.add_parser("replay", help="Run the detectors over the corpus")
+    replay_parser.add_argument("corpus", help="Corpus zip file")
+    replay_parser.add_argument("--detectors", nargs="+", choices=list(DETECTORS), default=None)
+    replay_parser.add_argument("--repeat", type=int, default=3, help="Timed runs per page and detector")
+    replay_parser.add_argument("--save-labels", action="store_true", help="Store outputs as labels where none exist")
+    replay_parser.add_argument("--details", action="store_true", help="Print per-page results")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "record":
+        urls = list(args.urls)
+        if args.urls_file:
+            urls += [line.strip() for line in Path(args.urls_file).read_text().splitlines() if line.strip()]
+        manifest = record_pages(urls, args.corpus, args.refresh)
+        print(f"Corpus {args.corpus} holds {len(manifest)} pages")
+    else:
+        summary, per_page = replay(args.corpus, args.detectors, args.repeat, args.save_labels)
+        print(summary.to_string())
+        if args.details:
+            print(per_page.drop(columns=["output", "label"]).to_string(index=False))
+        disagreements = per_page[per_page["agrees"] == False] if not per_page.empty else per_page  # noqa: E712
+        for row in disagreements.itertuples():
+            print(f"{row.detector} disagrees on {row.url}: got {row.output!r}, labelled {row.label!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+
+Fast character encoding detection for downloaded pages, shared by the scrapers.
+
+Statistical detectors such as chardet are pure Python and slow down with the
+size of the page, and ``requests``' ``response.text`` runs one over the whole
+body whenever the server does not declare a charset. Most pages declare their
+encoding somewhere cheap to find, so the checks run from cheapest to most
+expensive and stop at the first hit:
+
+1. a byte order mark, which describes the actual bytes and so wins over
+   any declaration, as in WHATWG encoding sniffing,
+2. the ``charset`` parameter of the HTTP ``Content-Type`` header,
+3. a ``<meta charset>`` / ``http-equiv`` declaration or XML declaration in the
+   first few KB of the page,
+4. a strict UTF-8 decode of a bounded sample,
+5. chardet on the same bounded sample, if it is installed.
+
+Labels are resolved the way browsers do, so ``iso-8859-1`` and ``us-ascii``
+decode as windows-1252.
+
+"""
+
+import codecs
+import re
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+# Declarations must appear early in the document, browsers look at 1024 bytes
+SNIFF_BYTES = 4 * 1024
+# Largest sample handed to the UTF-8 check and to chardet
+DETECTION_SAMPLE_BYTES = 64 * 1024
+DEFAULT_ENCODING = "utf-8"
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Labels browsers decode with a superset encoding
+ENCODING_ALIASES = {
+    "iso8859-1": "cp1252",
+    "ascii": "cp1252",
+    "iso8859-9": "cp1254",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+}
+
+CONTENT_TYPE_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE)
+XML_ENCODING = re.compile(rb"^<\?xml[^>]+encoding\s*=\s*[\"']([\w.:-]+)", re.IGNORECASE)
+
+
+def normalise_encoding(name):
+    """
+    Returns the Python codec to decode a declared charset with, or None if the
+    label is unknown.
+    """
+    if isinstance(name, bytes):
+        name = name.decode("ascii", errors="ignore")
+    try:
+        codec = codecs.lookup(name.strip().lower()).name
+    except (LookupError, AttributeError):
+        return None
+    return ENCODING_ALIASES.get(codec, codec)
+
+
+def charset_from_content_type(content_type):
+    """Returns the normalised charset of a Content-Type header value, or None."""
+    match = CONTENT_TYPE_CHARSET.search(content_type or "")
+    return normalise_encoding(match.group(1)) if match else None
+
+
+def sniff_bom(content):
+    """Returns the encoding announced by a byte order mark, or None."""
+    head = bytes(content[:4])
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def sniff_declared(content, sniff_bytes=SNIFF_BYTES):
+    """Returns the encoding declared by a meta tag or XML declaration, or None."""
+    head = bytes(content[:sniff_bytes])
+    for pattern in (XML_ENCODING, META_CHARSET):
+        match = pattern.search(head)
+        if match:
+            encoding = normalise_encoding(match.group(1))
+            # a page that says utf-16 in ASCII bytes cannot actually be utf-16
+            if encoding and not encoding.startswith("utf-16") and not encoding.startswith("utf-32"):
+                return encoding
+    return None
+
+
+def is_utf8(sample):
+    """
+    Checks whether a sample is valid UTF-8. The sample may end in the middle
+    of a character, as it is usually cut from a longer body.
+    """
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(content, content_type=None, sample_bytes=DETECTION_SAMPLE_BYTES):
+    """
+    Finds the encoding of a page.
+
+    Args:
+        content (bytes-like): The page body, or its beginning when streaming.
+        content_type (str, optional): Value of the HTTP Content-Type header.
+        sample_bytes (int): Bytes inspected by the UTF-8 check and chardet.
+
+    Returns:
+        tuple: The codec name and where it came from, one of ``bom``,
+               ``header``, ``meta``, ``utf-8``, ``detector`` or ``default``.
+    """
+    encoding = sniff_bom(content)
+    if encoding:
+        return encoding, "bom"
+    encoding = charset_from_content_type(content_type)
+    if encoding:
+        return encoding, "header"
+    encoding = sniff_declared(content)
+    if encoding:
+        return encoding, "meta"
+
+    sample = bytes(content[:sample_bytes])
+    if is_utf8(sample):
+        return "utf-8", "utf-8"
+    if chardet is not None:
+        encoding = normalise_encoding(chardet.detect(sample).get("encoding") or "")
+        if encoding:
+            return encoding, "detector"
+    return DEFAULT_ENCODING, "default"
+
+
+def decode_html(content, content_type=None, errors="replace"):
+    """
+    Decodes a page with its detected encoding. Undecodable bytes are replaced
+    instead of failing.
+
+    Args:
+        content (bytes-like): The page body.
+        content_type (str, optional): Value of the HTTP Content-Type header.
+        errors (str): Codec error handler.
+
+    Returns:
+        str: The page text.
+    """
+    if isinstance(content, str):
+        return content
+    encoding, _ = detect_encoding(content, content_type)
+    return bytes(content).decode(encoding, errors=errors)
+
+
+def decode_response(response, errors="replace"):
+    """
+    Decodes the body of a ``requests`` response. Use it instead of
+    ``response.text``, which falls back to detecting the encoding over the
+    whole body.
+    """
+    return decode_html(response.content, response.headers.get("Content-Type"), errors)
@@ -7,6 +7,7 @@ import requests
 import numexpr  
 import os  
 import argparse
+from contextlib import nullcontext
 from typing import Callable, Any, List, Dict  
 from urllib.parse import urlparse, unquote  
 from multiprocessing import cpu_count
@@ -16,6 +17,8 @@ from magic_google import MagicGoogle
 import pandas as pd
 from rich import print  
 from rich.console import Console 
+
+from live_dashboard import DashboardCounters, LiveDashboard
   
 
 # Decorator to suppress print statements  
@@ -122,7 +125,7 @@ def get_wikipedia_data(wiki_title):
         return ""
   
 # @calculate_time  
-def parallelize_calls(queries: List[str], max_threads: int , func: Callable = google_search) -> Dict[str, str]:  
+def parallelize_calls(queries: List[str], max_threads: int , func: Callable = google_search, show_dashboard: bool = False, skip_errors: bool = False) -> Dict[str, str]:  
     """  
     Executes the provided function for each query in parallel using ThreadPoolExecutor.  
   
@@ -130,6 +133,8 @@ def parallelize_calls(queries: List[str], max_threads: int , func: Callable = go
     - func: The function to execute for each query.  
     - queries: List of strings representing search queries.  
     - max_threads: Maximum number of threads to use for parallel execution.  
+    - show_dashboard: Show a live dashboard with completed calls, calls per second, queued calls and errors.  
+    - skip_errors: Log queries whose call raised and leave them out instead of re-raising the error.  
   
     Returns:  
     - Dictionary with query as key and search result as value.  
@@ -141,16 +146,29 @@ def parallelize_calls(queries: List[str], max_threads: int , func: Callable = go
             yield lst[i:i + n]  
   
     results = {}  
+    counters = DashboardCounters()
+    counters.queue_depth = len(queries)
+    dashboard = LiveDashboard(counters, title=func.__name__, total=len(queries)) if show_dashboard else nullcontext()
   
-    for chunk in chunks(queries, max_threads):  
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:  
-            futures = {executor.submit(func, query): query for query in chunk}
-            for future in concurrent.futures.as_completed(futures):  
-                query = futures[future]  
-                result = future.result()  
-                if result is not None:  
-                    results[query] = result  
-            time.sleep(random.randrange(min(30,max_threads-4), max_threads))
+    with dashboard:
+        for chunk in chunks(queries, max_threads):  
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:  
+                futures = {executor.submit(func, query): query for query in chunk}
+                for future in concurrent.futures.as_completed(futures):  
+                    query = futures[future]  
+                    counters.queue_depth -= 1
+                    try:
+                        result = future.result()  
+                    except Exception as e:
+                        counters.errors += 1
+                        if not skip_errors:
+                            raise
+                        logging.error(f"{func.__name__} failed for {query!r}: {e}")
+                        continue
+                    counters.completed += 1
+                    if result is not None:  
+                        results[query] = result  
+                time.sleep(random.randrange(min(30,max_threads-4), max_threads))
     return results 
 @calculate_time  
 def process_search(arguments):
@@ -168,7 +186,8 @@ def process_search(arguments):
     while not success:
         try:
             wiki_pages_dict = parallelize_calls(queries = companies_usa, 
-                                                max_threads = arguments["max_threads"],func=google_search)    
+                                                max_threads = arguments["max_threads"],func=google_search,
+                                                show_dashboard=True)    
             success = True
         except:
             time.sleep(300)
@@ -178,7 +197,8 @@ def process_search(arguments):
     console.print("Starting Wikipedia search......", style="yellow")
     success_pages = [ wiki_pages_dict[search] for search in wiki_pages_dict.keys() if wiki_pages_dict[search] != ""]
     wiki_content_dict = parallelize_calls(queries = success_pages,  
-                                          max_threads = arguments["max_threads"], func = get_wikipedia_data)
+                                          max_threads = arguments["max_threads"], func = get_wikipedia_data,
+                                          show_dashboard=True)
     console.print("Wikipedia Extraction complete......", style="dark_green")
 
     page_data = pd.DataFrame(list(wiki_pages_dict.items()), columns=['Company', 'Wikipedia Title']) 
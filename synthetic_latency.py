@@ -0,0 +1,28 @@
+"""
+
+Latency distributions shared by the offline benchmarks, so simulated servers
+and judges draw their response times the same way.
+
+"""
+
+import math
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+def sample_latency(rng, distribution, mean_ms):
+    """Draws one response latency in seconds."""
+    if mean_ms <= 0:
+        return 0.0
+    if distribution == "fixed":
+        value = mean_ms
+    elif distribution == "uniform":
+        value = rng.uniform(0, 2 * mean_ms)
+    elif distribution == "exponential":
+        value = rng.expovariate(1 / mean_ms)
+    elif distribution == "lognormal":
+        sigma = 1.0
+        value = rng.lognormvariate(math.log(mean_ms) - sigma ** 2 / 2, sigma)
+    else:
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    return value / 1000
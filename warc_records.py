@@ -0,0 +1,163 @@
+"""
+
+Parser for WARC response records as served by Common Crawl.
+
+A record is split into its WARC headers, HTTP status and headers and the HTTP
+payload. The payload is exposed as a memoryview over the decompressed record,
+so it is never copied until it is decoded, and decoding uses the encoding
+found by page_encoding (HTTP header, BOM, meta tag) instead of assuming UTF-8.
+
+``parse_record`` works on a single record, either still gzip-compressed (one
+member, as returned by a range request) or already decompressed, e.g. bytes
+read from a local cache. ``iter_records`` streams every record of a whole
+``.warc.gz`` file without loading it into memory.
+
+"""
+
+import gzip
+import zlib
+
+from page_encoding import decode_html, detect_encoding
+
+GZIP_MAGIC = b"\x1f\x8b"
+HEADER_END = b"\r\n\r\n"
+
+
+class WarcRecord:
+    """
+    One parsed WARC record.
+
+    Attributes:
+        warc_headers (dict): WARC header fields, e.g. ``WARC-Type`` and
+            ``WARC-Target-URI``.
+        status (int): HTTP status code, None for non-response records.
+        http_headers (dict): HTTP header fields with lowercased names.
+        payload (memoryview): The HTTP body, without copying it.
+    """
+
+    __slots__ = ("warc_headers", "status", "http_headers", "payload")
+
+    def __init__(self, warc_headers, status, http_headers, payload):
+        self.warc_headers = warc_headers
+        self.status = status
+        self.http_headers = http_headers
+        self.payload = payload
+
+    @property
+    def url(self):
+        return self.warc_headers.get("WARC-Target-URI")
+
+    @property
+    def charset(self):
+        """The encoding of the payload, see page_encoding.detect_encoding."""
+        return detect_encoding(self.payload, self.http_headers.get("content-type"))[0]
+
+    def text(self, errors="replace"):
+        """
+        Decodes the payload with its detected encoding. Undecodable bytes are
+        replaced instead of discarding the page.
+        """
+        return decode_payload(self.payload, self.http_headers.get("content-type"), errors)
+
+
+def decode_payload(payload, content_type=None, errors="replace"):
+    """Decodes a payload with the encoding found by page_encoding.detect_encoding."""
+    return decode_html(payload, content_type, errors)
+
+
+def parse_header_block(block):
+    """
+    Parses ``Name: value`` lines into a dict.
+
+    Returns:
+        tuple: The first line (WARC version or HTTP status line) and the fields.
+    """
+    lines = block.decode("latin-1").split("\r\n")
+    fields = {}
+    for line in lines[1:]:
+        name, separator, value = line.partition(":")
+        if separator:
+            fields[name.strip()] = value.strip()
+    return lines[0], fields
+
+
+def decompress_record(data):
+    """
+    Returns the decompressed bytes of a single gzip member, or the data itself
+    if it is not compressed.
+    """
+    if bytes(data[:2]) != GZIP_MAGIC:
+        return data if isinstance(data, bytes) else bytes(data)
+    return zlib.decompressobj(wbits=31).decompress(data)
+
+
+def parse_block(warc_headers, raw, start, end):
+    """
+    Splits the content block ``raw[start:end]`` of a record into HTTP status,
+    headers and payload. Only the header bytes are copied.
+    """
+    view = memoryview(raw)
+    if warc_headers.get("WARC-Type") != "response" or not raw.startswith(b"HTTP/", start):
+        return WarcRecord(warc_headers, None, {}, view[start:end])
+
+    http_end = raw.find(HEADER_END, start, end)
+    if http_end < 0:
+        return WarcRecord(warc_headers, None, {}, view[start:end])
+    status_line, http_headers = parse_header_block(raw[start:http_end])
+    status_parts = status_line.split(" ", 2)
+    status = int(status_parts[1]) if len(status_parts) > 1 and status_parts[1].isdigit() else None
+    http_headers = {name.lower(): value for name, value in http_headers.items()}
+    return WarcRecord(warc_headers, status, http_headers, view[http_end + len(HEADER_END):end])
+
+
+def parse_record(data):
+    """
+    Parses one WARC record.
+
+    Args:
+        data (bytes-like): A gzip member holding the record, as returned by a
+            Common Crawl range request, or the decompressed record.
+
+    Returns:
+        WarcRecord: The parsed record. Its payload is a view into the
+        decompressed data.
+    """
+    raw = decompress_record(data)
+    warc_end = raw.find(HEADER_END)
+    if warc_end < 0:
+        raise ValueError("Truncated WARC record: missing header terminator")
+    _, warc_headers = parse_header_block(raw[:warc_end])
+    start = warc_end + len(HEADER_END)
+
+    content_length = warc_headers.get("Content-Length")
+    end = start + int(content_length) if content_length else len(raw)
+    return parse_block(warc_headers, raw, start, min(end, len(raw)))
+
+
+def iter_records(fileobj):
+    """
+    Streams the records of a WARC file.
+
+    Args:
+        fileobj: Binary file object of a ``.warc`` or ``.warc.gz`` file. Each
+            record is read on its own, so memory use is bounded by the largest
+            record rather than the file.
+
+    Yields:
+        WarcRecord: Every record in the file.
+    """
+    head = fileobj.peek(2)[:2] if hasattr(fileobj, "peek") else b""
+    stream = gzip.GzipFile(fileobj=fileobj) if head == GZIP_MAGIC else fileobj
+    while True:
+        header_lines = []
+        line = stream.readline()
+        while line in (b"\r\n", b"\n"):
+            line = stream.readline()
+        if not line:
+            return
+        while line and line not in (b"\r\n", b"\n"):
+            header_lines.append(line)
+            line = stream.readline()
+        _, warc_headers = parse_header_block(b"".join(header_lines).rstrip(b"\r\n"))
+        content = stream.read(int(warc_headers.get("Content-Length", 0)))
+        yield parse_block(warc_headers, content, 0, len(content))
@@ -0,0 +1,211 @@
+"""
+
+Local store for raw Common Crawl WARC records.
+
+Records on data.commoncrawl.org never change once published, so a record is
+fully identified by its ``(filename, offset, length)`` triple. The store keeps
+the compressed bytes of every fetched record, appended to packed segment files,
+and an append-only JSON-lines index mapping each triple to its place in a
+segment. Re-running extraction over records already in the store reads them
+from disk instead of the network.
+
+When the store grows beyond ``max_bytes`` the oldest segments are evicted as a
+whole. Opened with ``read_only=True`` the segments are memory-mapped and
+records are returned as zero-copy memoryviews, which ``warc_records.parse_record``
+accepts directly.
+
+"""
+
+import json
+import mmap
+import os
+import threading
+import zlib
+from pathlib import Path
+
+DEFAULT_STORE_DIR = Path.home() / ".cache" / "commoncrawl-warc"
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+INDEX_NAME = "index.jsonl"
+
+
+def record_key(result):
+    """Returns the ``(filename, offset, length)`` key of a search result."""
+    return result["filename"], int(result["offset"]), int(result["length"])
+
+
+class WarcRecordStore:
+    """
+    Packed, size-bounded store of raw WARC records.
+
+    Args:
+        root (str): Directory holding the segments and the index.
+        max_bytes (int, optional): Size the segments may take up before the
+            oldest ones are evicted. Unbounded when None.
+        segment_bytes (int): Size at which a new segment is started.
+        read_only (bool): Memory-map the segments and refuse writes.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, max_bytes=None, segment_bytes=DEFAULT_SEGMENT_BYTES,
+                 read_only=False):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.read_only = read_only
+        self.index = {}
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._writer = None
+        if not read_only:
+            self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def segment_path(self, segment):
+        return self.root / f"segment_{segment:06d}.bin"
+
+    def segments(self):
+        """Returns the ids of the segments on disk, oldest first."""
+        return sorted(int(path.stem.split("_")[1]) for path in self.root.glob("segment_*.bin"))
+
+    def size(self):
+        return sum(self.segment_path(segment).stat().st_size for segment in self.segments())
+
+    def _load_index(self):
+        """
+        Reads the index, skipping entries whose bytes never made it into their
+        segment, e.g. after a crash between the two writes.
+        """
+        index_path = self.root / INDEX_NAME
+        if not index_path.exists():
+            return
+        sizes = {segment: self.segment_path(segment).stat().st_size for segment in self.segments()}
+        with open(index_path, encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    filename, offset, length, segment, position, checksum = json.loads(line)
+                except ValueError:
+                    continue
+                if position + length <= sizes.get(segment, -1):
+                    self.index[filename, offset, length] = (segment, position, checksum)
+
+    def get(self, key, verify=False):
+        """
+        Returns the raw bytes of a record, or None if it is not stored.
+
+        Args:
+            key (tuple): ``(filename, offset, length)`` of the record.
+            verify (bool): Check the stored CRC-32 before returning.
+
+        Returns:
+            The record bytes, a memoryview into the mapped segment in read-only
+            mode.
+        """
+        location = self.index.get(key)
+        if location is None:
+            return None
+        segment, position, checksum = location
+        length = key[2]
+        if self.read_only:
+            mapped = self._maps.get(segment)
+            if mapped is None:
+                with open(self.segment_path(segment), "rb") as segment_file:
+                    mapped = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            data = memoryview(mapped)[position:position + length]
+        else:
+            with open(self.segment_path(segment), "rb") as segment_file:
+                segment_file.seek(position)
+                data = segment_file.read(length)
+        if verify and zlib.crc32(data) != checksum:
+            raise ValueError(f"Corrupt record {key} in segment {segment}")
+        return data
+
+    def put(self, key, data):
+        """
+        Appends a record to the current segment. Records already stored are
+        left untouched.
+
+        Args:
+            key (tuple): ``(filename, offset, length)`` of the record.
+            data (bytes-like): The raw record bytes, ``length`` bytes long.
+        """
+        if self.read_only:
+            raise PermissionError("The record store was opened read-only")
+        if len(data) != key[2]:
+            raise ValueError(f"Record {key} has {len(data)} bytes, expected {key[2]}")
+        with self._lock:
+            if key in self.index:
+                return
+            segment, segment_file = self._open_writer(len(data))
+            position = segment_file.tell()
+            segment_file.write(data)
+            segment_file.flush()
+            checksum = zlib.crc32(data)
+            with open(self.root / INDEX_NAME, "a", encoding="utf-8") as index_file:
+                index_file.write(json.dumps([*key, segment, position, checksum]) + "\n")
+            self.index[key] = (segment, position, checksum)
+            if self.max_bytes is not None and segment_file.tell() == len(data):
+                # a new segment was started, this is where the store grows
+                self._evict()
+
+    def _open_writer(self, incoming):
+        if self._writer is not None:
+            segment, segment_file = self._writer
+            if segment_file.tell() + incoming <= self.segment_bytes or segment_file.tell() == 0:
+                return self._writer
+            segment_file.close()
+            segment += 1
+        else:
+            segments = self.segments()
+            segment = segments[-1] if segments else 0
+            if self.segment_path(segment).exists() and \
+                    self.segment_path(segment).stat().st_size + incoming > self.segment_bytes:
+                segment += 1
+        self._writer = (segment, open(self.segment_path(segment), "ab"))
+        return self._writer
+
+    def _evict(self):
+        """Deletes the oldest segments until the store fits into max_bytes."""
+        segments = self.segments()
+        current = self._writer[0] if self._writer else None
+        total = sum(self.segment_path(segment).stat().st_size for segment in segments)
+        evicted = set()
+        for segment in segments:
+            if total <= self.max_bytes or segment == current:
+                break
+            total -= self.segment_path(segment).stat().st_size
+            self.segment_path(segment).unlink()
+            evicted.add(segment)
+        if evicted:
+            self.index = {key: location for key, location in self.index.items() if location[0] not in evicted}
+            self._rewrite_index()
+
+    def _rewrite_index(self):
+        temp_path = self.root / f"{INDEX_NAME}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            for key, (segment, position, checksum) in self.index.items():
+                index_file.write(json.dumps([*key, segment, position, checksum]) + "\n")
+        os.replace(temp_path, self.root / INDEX_NAME)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer[1].close()
+            self._writer = None
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # records handed out are still referenced, the map closes once they are released
+                pass
+        self._maps = {}
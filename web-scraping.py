@@ -4,21 +4,24 @@ from scrapy.crawler import CrawlerProcess
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import CrawlSpider, Rule
 from scrapy import signals
-from twisted.internet import reactor, task, error
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from twisted.internet import task, error
 from bs4 import BeautifulSoup
 import pandas as pd
+import json
 import logging
-import time
+import resource
 from fake_useragent import UserAgent
 
 from urllib.parse import urlparse
 import tldextract
 
+from live_dashboard import DashboardCounters, LiveDashboard
+
 # Constants
 MAX_LIMIT = 10  # Example limit per start_url
 DEPTH_LIMIT = 4  # Example depth limit
 DEPTH_PRIORITY = 10  # Example priority adjustment
-IDLE_TIMEOUT = 6  # Idle timeout in seconds
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -61,7 +64,7 @@ def extract_domain(url):
 class PatternCrawler(CrawlSpider):
     name = "pattern_crawler"
 
-    def __init__(self, start_urls, output_file, allowed_patterns, max_depth=1, *args, **kwargs):
+    def __init__(self, start_urls, output_file, allowed_patterns, max_depth=1, stats_file=None, *args, **kwargs):
         super(PatternCrawler, self).__init__(*args, **kwargs)
         self.start_urls = start_urls
           # Track scraped count per start_url
@@ -71,9 +74,10 @@ class PatternCrawler(CrawlSpider):
         self.scraped_counts = {
             url: 0 for url in self.start_domains
         }
-        self.last_item_time = time.time()
-        self.idle_task = None
+        self.closed_domains = set()
         self.output_file = output_file
+        self.stats_file = stats_file
+        self.html_parser = "html.parser"
         self.total_scraped = 0
         self.depth = DEPTH_LIMIT
         self.rules = (Rule(LinkExtractor(allow_domains = self.start_domains, unique=True, restrict_xpaths=["//a"]), 
@@ -93,13 +97,13 @@ class PatternCrawler(CrawlSpider):
         #         pass
 
         if request_domain not in self.start_domains: #check domain is in start domain list
-            self.logger.info(
+            self.logger.debug(
                 "Skipping URL as it is not a subpage of the start URLs: %s", request.url
             )
             return None
         
-        if self.scraped_counts[request_domain] >= MAX_LIMIT:
-            self.logger.info(
+        if self.is_domain_closed(request_domain):
+            self.logger.debug(
                 f"Max URL limit ({MAX_LIMIT}) reached for {request_domain}. Skipping: {request.url}"
             )
             return None
@@ -108,11 +112,16 @@ class PatternCrawler(CrawlSpider):
         if current_depth >= DEPTH_LIMIT:
             return None
         request.priority = request.priority - (current_depth * 10)
-        self.logger.info(f"Requesting URL: {request.url} at depth - {current_depth}, domain count - {self.scraped_counts[request_domain]}")
+        self.logger.debug("Requesting URL: %s at depth - %s, domain count - %s", request.url, current_depth, self.scraped_counts[request_domain])
 
         return request
 
     def parse_item(self, response):
+        start_url = self.get_domain(response.url)
+        # responses already in flight when their domain was closed are neither counted nor saved
+        if self.is_domain_closed(start_url) or self.scraped_counts.get(start_url, 0) >= MAX_LIMIT:
+            return
+
         title = response.css("title::text").get()
         body_html = response.css("body").get()
 
@@ -120,162 +129,517 @@ class PatternCrawler(CrawlSpider):
             self.logger.warning("Missing title or body in URL: %s", response.url)
             return
 
-        soup = BeautifulSoup(body_html, "html.parser")
+        soup = BeautifulSoup(body_html, self.html_parser)
         body_text = soup.get_text(separator="\n", strip=True)
         self.total_scraped +=1
-        start_url = self.get_domain(response.url)
         if start_url and start_url in self.start_domains:
             self.scraped_counts[start_url] += 1
+            if self.scraped_counts[start_url] >= MAX_LIMIT:
+                self.close_domain(start_url)
         # self.logger.info(f"Crawling URL: {response.url} at depth - {response.meta["depth"]}, domain count - {self.scraped_counts[start_url]}" )
         item = {"url": response.url, "title": title, "body": body_text}
         self.scraped_data.append(item)
         yield item
-        self.last_item_time = time.time()
 
     @classmethod
     def from_crawler(cls, crawler, *args, **kwargs):
         spider = super(PatternCrawler, cls).from_crawler(crawler, *args, **kwargs)
         crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        spider.html_parser = crawler.settings.get("HTML_PARSER", spider.html_parser)
         return spider
 
+    def is_domain_closed(self, domain):
+        return domain in self.closed_domains
+
+    def close_domain(self, domain):
+        """
+        Marks a start domain as finished once its page budget is spent.
+
+        Requests for a closed domain that are still waiting in the scheduler are
+        dropped by DomainBudgetMiddleware before they reach the downloader, and
+        the ones already waiting in its downloader slots are dropped here. When
+        every start domain is closed the spider is shut down straight away rather
+        than waiting for the remaining queue to drain.
+
+        Args:
+            domain (str): The start domain whose budget has been used up.
+        """
+        if domain in self.closed_domains:
+            return
+        self.closed_domains.add(domain)
+        self.logger.info(
+            f"Budget of {MAX_LIMIT} pages spent for {domain} "
+            f"({len(self.closed_domains)}/{len(self.scraped_counts)} domains done)"
+        )
+        for slot_key, slot in self.crawler.engine.downloader.slots.items():
+            if extract_domain(slot_key) != domain:
+                continue
+            while slot.queue:
+                request, deferred = slot.queue.popleft()
+                deferred.errback(IgnoreRequest(f"Domain budget spent: {request.url}"))
+        if len(self.closed_domains) == len(self.scraped_counts):
+            self.crawler.engine.close_spider(self, "domain_budgets_spent")
+
+    def crawl_state(self):
+        """
+        Reads the amount of outstanding work from the running engine.
+
+        Returns:
+            dict: Requests waiting in the scheduler, requests in the downloader
+                  (active, queued in slots and transferring) and responses still
+                  being processed by the scraper.
+        """
+        engine = self.crawler.engine
+        downloader = engine.downloader
+        slots = downloader.slots.values()
+        return {
+            "scheduled": len(engine.slot.scheduler) if engine.slot else 0,
+            "downloading": len(downloader.active),
+            "slot_queued": sum(len(slot.queue) for slot in slots),
+            "transferring": sum(len(slot.transferring) for slot in slots),
+            "scraping": len(engine.scraper.slot.active) if engine.scraper.slot else 0,
+        }
+
     def spider_idle(self):
-        if self.idle_task is None:
-            self.idle_task = task.LoopingCall(self.check_idle)
-            self.idle_task.start(1.0)
-
-    def check_idle(self):
-        idle_time = time.time() - self.last_item_time
-        if idle_time > IDLE_TIMEOUT:
-            self.logger.info(
-                f"Idle timeout ({IDLE_TIMEOUT}s) reached. Stopping reactor."
-            )
-            if reactor.running:
-                reactor.stop()
-            if self.idle_task and self.idle_task.running:
-                self.idle_task.stop()
+        """
+        Called by the engine once the scheduler, downloader and scraper have no
+        work left. Nothing is kept alive here, so the spider closes as soon as
+        the last response has been processed and CrawlerProcess stops the
+        reactor afterwards.
+        """
+        state = self.crawl_state()
+        open_domains = [
+            domain for domain in self.scraped_counts if domain not in self.closed_domains
+        ]
+        self.logger.info(
+            f"Crawl finished: {self.total_scraped} pages, state {state}, "
+            f"{len(open_domains)} domains ran out of links before their budget"
+        )
 
     def close(self, reason):
         """Convert scraped data to DataFrame and return it."""
         df = pd.DataFrame(self.scraped_data)
         self.logger.info("Scraped data converted to DataFrame")
         df.to_excel(self.output_file, index=False)
+        if self.stats_file is not None:
+            stats = {
+                "reason": reason,
+                "total_scraped": self.total_scraped,
+                "scraped_counts": self.scraped_counts,
+                "closed_domains": sorted(self.closed_domains),
+            }
+            Path(self.stats_file).write_text(json.dumps(stats, indent=2))
+
+
+class DomainBudgetMiddleware:
+    """
+    Downloader middleware that drops queued requests for domains whose page
+    budget was spent after the request had already been scheduled.
+    """
+
+    def process_request(self, request, spider):
+        is_domain_closed = getattr(spider, "is_domain_closed", None)
+        if is_domain_closed is None:
+            return None
+        if is_domain_closed(extract_domain(request.url)):
+            raise IgnoreRequest(f"Domain budget spent: {request.url}")
+        return None
+
+
+# Sent by DownloadFailureSignal for every download that raised, Scrapy has no such signal
+download_failed = object()
+
+
+class DownloadFailureSignal:
+    """
+    Downloader middleware announcing failed downloads (timeouts, DNS and
+    connection errors) with the ``download_failed`` signal. It sits next to the
+    downloader, so it sees each failure before RetryMiddleware turns it into a
+    retry. Requests dropped on purpose with IgnoreRequest are not failures.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_exception(self, request, exception, spider):
+        if not isinstance(exception, IgnoreRequest):
+            self.crawler.signals.send_catch_log(download_failed, request=request, exception=exception, spider=spider)
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Extension that tunes global and per-domain concurrency while the crawl runs.
+
+    Every ADAPTIVE_CONCURRENCY_INTERVAL seconds each downloader slot with at least
+    ADAPTIVE_CONCURRENCY_MIN_SAMPLES finished requests is judged on them:
+
+    * error rate (429 and 5xx responses plus failed downloads, redirects are not
+      errors) above ADAPTIVE_CONCURRENCY_ERROR_RATE, or smoothed latency above
+      ADAPTIVE_CONCURRENCY_LATENCY_FACTOR times the fastest smoothed latency seen
+      for that slot, halves its concurrency and doubles its delay;
+    * otherwise, while RSS is below ADAPTIVE_CONCURRENCY_MEMORY_HIGH, its delay
+      decays from DOWNLOAD_DELAY towards ADAPTIVE_CONCURRENCY_MIN_DELAY, and once
+      the delay is at that floor a slot with requests still queued gains one more
+      concurrent request. While a slot has a delay Scrapy sends one request per
+      delay, so concurrency only limits it at the floor.
+
+    The global limit follows process RSS: above ADAPTIVE_CONCURRENCY_MEMORY_HIGH
+    of MEMUSAGE_LIMIT_MB it is halved, below ADAPTIVE_CONCURRENCY_MEMORY_LOW it
+    grows again up to CONCURRENT_REQUESTS, so the crawl backs off well before the
+    MemoryUsage extension would kill it. This needs the live RSS from /proc and is
+    switched off where it is not available.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.interval = settings.getfloat("ADAPTIVE_CONCURRENCY_INTERVAL", 5.0)
+        self.min_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1)
+        self.max_concurrency = settings.getint("CONCURRENT_REQUESTS")
+        self.max_domain_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_PER_DOMAIN_MAX", 32)
+        self.latency_factor = settings.getfloat("ADAPTIVE_CONCURRENCY_LATENCY_FACTOR", 3.0)
+        self.error_rate = settings.getfloat("ADAPTIVE_CONCURRENCY_ERROR_RATE", 0.2)
+        self.min_delay = settings.getfloat("ADAPTIVE_CONCURRENCY_MIN_DELAY", 0.0)
+        self.max_delay = settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_DELAY", 10.0)
+        self.memory_limit = settings.getint("MEMUSAGE_LIMIT_MB") * 1024 * 1024
+        self.memory_high = settings.getfloat("ADAPTIVE_CONCURRENCY_MEMORY_HIGH", 0.8)
+        self.memory_low = settings.getfloat("ADAPTIVE_CONCURRENCY_MEMORY_LOW", 0.6)
+        self.min_samples = settings.getint("ADAPTIVE_CONCURRENCY_MIN_SAMPLES", 5)
+        self.window = {}
+        self.latency = {}
+        self.baseline_latency = {}
+        self.task = None
+
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(self.response_received, signal=signals.response_received)
+        crawler.signals.connect(self.request_left_downloader, signal=signals.request_left_downloader)
+        crawler.signals.connect(self.download_failed, signal=download_failed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def spider_opened(self, spider):
+        if self.memory_limit and self.current_rss() is None:
+            spider.logger.warning("No live RSS available, memory based concurrency backoff is disabled")
+            self.memory_limit = 0
+        self.task = task.LoopingCall(self.adjust, spider)
+        self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.task and self.task.running:
+            self.task.stop()
+
+    def _window(self, request):
+        key = request.meta.get("download_slot")
+        if key not in self.window:
+            self.window[key] = {"requests": 0, "errors": 0, "latency": 0.0, "responses": 0}
+        return self.window[key]
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is None:
+            return
+        window = self._window(request)
+        window["responses"] += 1
+        window["latency"] += latency
+        if response.status == 429 or response.status >= 500:
+            window["errors"] += 1
+
+    def request_left_downloader(self, request, spider):
+        # Fired for every download, whatever its outcome
+        self._window(request)["requests"] += 1
+
+    def download_failed(self, request, exception, spider):
+        self._window(request)["errors"] += 1
+
+    def current_rss(self):
+        """
+        Resident set size of the process in bytes, or None where it cannot be
+        read. ru_maxrss is no substitute: it is the peak and never goes down.
+        """
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * resource.getpagesize()
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def adjust(self, spider):
+        downloader = self.crawler.engine.downloader
+        window, self.window = self.window, {}
+        usage = self.current_rss() / self.memory_limit if self.memory_limit else 0.0
+
+        for key, stats in window.items():
+            slot = downloader.slots.get(key)
+            if slot is None:
+                continue
+            if stats["requests"] < self.min_samples:
+                # too little traffic to judge, keep counting into the next window
+                pending = self.window.setdefault(key, {"requests": 0, "errors": 0, "latency": 0.0, "responses": 0})
+                for name, value in stats.items():
+                    pending[name] += value
+                continue
+            error_rate = stats["errors"] / stats["requests"]
+            slow = False
+            if stats["responses"]:
+                mean_latency = stats["latency"] / stats["responses"]
+                smoothed = self.latency.get(key, mean_latency)
+                smoothed = 0.7 * smoothed + 0.3 * mean_latency
+                self.latency[key] = smoothed
+                self.baseline_latency[key] = min(self.baseline_latency.get(key, smoothed), smoothed)
+                slow = smoothed > self.baseline_latency[key] * self.latency_factor
+
+            if error_rate > self.error_rate or slow:
+                slot.concurrency = max(self.min_concurrency, slot.concurrency // 2)
+                slot.delay = min(self.max_delay, max(slot.delay * 2, self.min_delay, 0.5))
+                spider.logger.debug(
+                    f"Backing off {key}: concurrency {slot.concurrency}, delay {slot.delay:.2f}s "
+                    f"(error rate {error_rate:.2f}, latency {self.latency.get(key)})"
+                )
+            elif usage < self.memory_high:
+                if slot.delay <= self.min_delay and slot.queue:
+                    slot.concurrency = min(self.max_domain_concurrency, slot.concurrency + 1)
+                slot.delay = self.min_delay + (slot.delay - self.min_delay) * 0.75
+                if slot.delay - self.min_delay < 0.05:
+                    slot.delay = self.min_delay
+
+        if self.memory_limit:
+            if usage > self.memory_high:
+                downloader.total_concurrency = max(self.min_concurrency, downloader.total_concurrency // 2)
+                spider.logger.info(
+                    f"Memory at {usage:.0%} of MEMUSAGE_LIMIT_MB, global concurrency lowered to {downloader.total_concurrency}"
+                )
+            elif usage < self.memory_low and len(downloader.active) >= downloader.total_concurrency:
+                downloader.total_concurrency = min(
+                    self.max_concurrency, downloader.total_concurrency + max(1, downloader.total_concurrency // 4)
+                )
+
+
+class CrawlDashboard:
+    """
+    Extension showing a LiveDashboard for the running crawl in place of the
+    per-request log lines.
+
+    Signal handlers only increment counters. Per-domain budget use is read from
+    the spider's own ``scraped_counts`` and queue depth is sampled from the
+    engine at the refresh rate, so the per-event cost stays constant.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CRAWL_DASHBOARD_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.refresh_per_second = settings.getfloat("CRAWL_DASHBOARD_REFRESH_PER_SECOND", 2)
+        self.counters = DashboardCounters()
+        self.dashboard = None
+        self.task = None
+
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(self.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(self.response_received, signal=signals.response_received)
+        crawler.signals.connect(self.download_failed, signal=download_failed)
+        crawler.signals.connect(self.spider_error, signal=signals.spider_error)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def spider_opened(self, spider):
+        self.counters.groups = getattr(spider, "scraped_counts", {})
+        self.dashboard = LiveDashboard(
+            self.counters,
+            title=f"{spider.name} - domain budgets",
+            group_budget=MAX_LIMIT,
+            refresh_per_second=self.refresh_per_second,
+        )
+        self.dashboard.start()
+        self.task = task.LoopingCall(self.sample_queue, spider)
+        self.task.start(1 / self.refresh_per_second)
+
+    def spider_closed(self, spider):
+        if self.task and self.task.running:
+            self.task.stop()
+        if self.dashboard is not None:
+            self.dashboard.stop()
+
+    def sample_queue(self, spider):
+        crawl_state = getattr(spider, "crawl_state", None)
+        if crawl_state is not None:
+            state = crawl_state()
+            self.counters.queue_depth = state["scheduled"] + state["slot_queued"]
+
+    def item_scraped(self, item, spider):
+        self.counters.completed += 1
+
+    def response_received(self, response, request, spider):
+        self.counters.bytes += len(response.body)
+        if response.status >= 400:
+            self.counters.errors += 1
+
+    def download_failed(self, request, exception, spider):
+        self.counters.errors += 1
+
+    def spider_error(self, failure, response, spider):
+        self.counters.errors += 1
+
+
+PATTERNS = ["about", "contact", "features", "products", "services", ]
+START_URLS = [
+    "https://www.advancionsciences.com",
+    "https://www.abc-group.com",
+    "https://www.rsmus.com/",  # RSM US LLP
+    "https://www.gt.com/",  # Grant Thornton LLP
+    "https://www.bakertilly.com/",  # Baker Tilly
+    "https://www.bdo.com/global", #BDO
+    "https://www.plante Moran.com/", #Plante Moran
+    "https://www.crowe.com/", #Crowe
+    "https://www.claconnect.com/", #CLA (CliftonLarsonAllen)
+    "https://www.forvis.com/", #Forvis
+    "https://www.armstrongworldindustries.com/", #Armstrong World Industries
+    "https://www.jeld-wen.com/", #Jeld-Wen
+    "https://www.sensata.com/", #Sensata Technologies
+    "https://www.aaon.com/", #AAON
+    "https://www.brinkman.com/", #Brinkman Construction
+    "https://www.schneiderresources.com/", #Schneider Resources
+    "https://www.heniff.com/", #Heniff Transportation Systems
+    "https://www.milliken.com/", #Milliken & Company
+    "https://www.penske.com/", #Penske Corporation
+    "https://www.crowncork.com/", #Crown Holdings, Inc.
+    "https://www.cbre.com/", #CBRE Group, Inc.
+    "https://www.jll.com/", #Jones Lang LaSalle Incorporated
+    "https://www.colliers.com/", #Colliers International
+    "https://www.cushmanwakefield.com/", #Cushman & Wakefield
+    "https://www.hubinternational.com/", #Hub International
+    "https://www.ajg.com/", #Arthur J. Gallagher & Co.
+    "https://www.marshmclennan.com/", #Marsh McLennan
+    "https://www.lockton.com/", #Lockton Companies
+    "https://www.assuredpartners.com/", #AssuredPartners
+    "https://www.acrisure.com/", #Acrisure
+    "https://www.ryan.com/", #Ryan, LLC
+    "https://www.alvarezandmarsal.com/", #Alvarez & Marsal
+    "https://www.protiviti.com/", #Protiviti
+    "https://www.fti consulting.com/", #FTI Consulting
+    "https://www.alixpartners.com/", #AlixPartners
+    "https://www.ghclongpoint.com/", #GHCLongPoint
+    "https://www.lincolninternational.com/", #Lincoln International
+    "https://www.airdri.com/", #Airdri
+    "https://www.atlasmachinery.com/", #Atlas Machinery
+    "https://www.bakerpetroleum.com/", #Baker Petroleum
+    "https://www.centuryprinting.com/", #Century Printing
+    "https://www.davisstandard.com/", #Davis-Standard
+    "https://www.eliteamc.com/", #Elite AMC Management
+    "https://www.fivestarchemicals.com/", #Five Star Chemicals
+    "https://www.gulfcoastfilters.com/", #Gulf Coast Filters
+    "https://www.hytrol.com/", #Hytrol Conveyor Company
+    "https://www.intercon1.com/", #Intercon 1
+    "https://www.lewiscontractors.com/", #Lewis Contractors
+    "https://www.mccormickdistilling.com/", #McCormick Distilling Company
+    "https://www.nationalgypsum.com/", #National Gypsum
+    "https://www.ocv.com/", #OCV Control Valves
+    "https://www.pattersonpump.com/", #Patterson Pump Company
+    "https://www.qualitydie.com/", #Quality Die Company
+    "https://www.reynoldsamerican.com/", #Reynolds American Inc.
+    "https://www.steelcase.com/", #Steelcase
+    "https://www.textron.com/", #Textron
+    "https://www.usg.com/", #USG Corporation
+    "https://www.valmont.com/", #Valmont Industries
+    "https://www.williamsbakery.com/", #Williams Bakery
+    "https://www.yorklabel.com/", #York Label
+    "https://www.zurn.com/", #Zurn Water Solutions
+]  # List of URLs to crawl
+
+
+def crawl_settings(ua):
+    """
+    Builds the CrawlerProcess settings shared by every PatternCrawler run.
+
+    Args:
+        ua (UserAgent): Source of the random user agent strings.
+
+    Returns:
+        dict: Scrapy settings.
+    """
+    return {
+        "DEPTH_LIMIT": 2,
+        "DEPTH_PRIORITY": 10,
+        "LOG_LEVEL": "INFO",
+        "USER_AGENT": ua.random,
+        "COOKIES_ENABLED": False,
+        "ROBOTSTXT_OBEY": False,
+        "DOWNLOADER_MIDDLEWARES": {
+            f"{__name__}.DomainBudgetMiddleware": 50,
+            # after RetryMiddleware (550), so failures are seen before they are retried
+            f"{__name__}.DownloadFailureSignal": 950,
+        },
+        "EXTENSIONS": {
+            f"{__name__}.AdaptiveConcurrency": 500,
+            f"{__name__}.CrawlDashboard": 510,
+        },
+        "CRAWL_DASHBOARD_ENABLED": True,
+        "CRAWL_DASHBOARD_REFRESH_PER_SECOND": 2,
+
+        "DEFAULT_REQUEST_HEADERS": HEADERS,
+
+        "CONCURRENT_REQUESTS": 300,  # Upper bound, AdaptiveConcurrency works below it
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 10,  # Starting value per domain
+        "ADAPTIVE_CONCURRENCY_ENABLED": True,
+        "ADAPTIVE_CONCURRENCY_INTERVAL": 5.0,
+        "ADAPTIVE_CONCURRENCY_PER_DOMAIN_MAX": 32,
+        "ADAPTIVE_CONCURRENCY_LATENCY_FACTOR": 3.0,
+        "ADAPTIVE_CONCURRENCY_ERROR_RATE": 0.2,
+        "ADAPTIVE_CONCURRENCY_MIN_DELAY": 0.0,  # DOWNLOAD_DELAY is the starting delay, healthy domains go below it
+        # "CONCURRENT_REQUESTS_PER_IP": 10,
+        "DOWNLOAD_DELAY": 2.5,
+        "DOWNLOAD_MAXSIZE": 3355443,
+        "DOWNLOAD_TIMEOUT": 120,  # Timeout for each download in seconds
+        "RETRY_ENABLED": False,
+
+        "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
+        "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.FifoMemoryQueue",
+        "SCHEDULER_PRIORITY_QUEUE": "scrapy.pqueues.DownloaderAwarePriorityQueue",
+        
+        # "CLOSESPIDER_PAGECOUNT_NO_ITEM": 30,
+        # "CLOSESPIDER_ITEMCOUNT": MAX_LIMIT*0.9*len(urls),
+        "REDIRECT_PRIORITY_ADJUST": -1,
+        "RANDOMIZE_DOWNLOAD_DELAY": True,
+        "MEMUSAGE_ENABLED": True,
+        "MEMUSAGE_LIMIT_MB": 4096,
+        "MEMUSAGE_WARNING_MB": 3072,
+        "REACTOR_THREADPOOL_MAXSIZE": 32,  # Only DNS lookups use this pool
+        "ROBOTSTXT_PARSER": "scrapy.robotstxt.PythonRobotParser",
+        "ROBOTSTXT_USER_AGENT": ua.random,
+        "HTTPCACHE_ALWAYS_STORE": True,
+        "FAKEUSERAGENT_PROVIDERS" : [
+            'scrapy_fake_useragent.providers.FakeUserAgentProvider',  # This is the first provider we'll try
+            'scrapy_fake_useragent.providers.FakerProvider',  # If FakeUserAgentProvider fails, we'll use faker to generate a user-agent string for us
+            'scrapy_fake_useragent.providers.FixedUserAgentProvider',  # Fall back to USER_AGENT value
+        ],
+        # "DOWNLOAD_HANDLERS": {
+        #     "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+        #     "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+        # },
+        # "TWISTED_REACTOR" : "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+        "PLAYWRIGHT_BROWSER_TYPE": "firefox",
+
+    }
 
 
 def main():
-    patterns = ["about", "contact", "features", "products", "services", ]
     ua = UserAgent()
-    urls = [
-        "https://www.advancionsciences.com",
-        "https://www.abc-group.com",
-        "https://www.rsmus.com/",  # RSM US LLP
-        "https://www.gt.com/",  # Grant Thornton LLP
-        "https://www.bakertilly.com/",  # Baker Tilly
-        "https://www.bdo.com/global", #BDO
-        "https://www.plante Moran.com/", #Plante Moran
-        "https://www.crowe.com/", #Crowe
-        "https://www.claconnect.com/", #CLA (CliftonLarsonAllen)
-        "https://www.forvis.com/", #Forvis
-        "https://www.armstrongworldindustries.com/", #Armstrong World Industries
-        "https://www.jeld-wen.com/", #Jeld-Wen
-        "https://www.sensata.com/", #Sensata Technologies
-        "https://www.aaon.com/", #AAON
-        "https://www.brinkman.com/", #Brinkman Construction
-        "https://www.schneiderresources.com/", #Schneider Resources
-        "https://www.heniff.com/", #Heniff Transportation Systems
-        "https://www.milliken.com/", #Milliken & Company
-        "https://www.penske.com/", #Penske Corporation
-        "https://www.crowncork.com/", #Crown Holdings, Inc.
-        "https://www.cbre.com/", #CBRE Group, Inc.
-        "https://www.jll.com/", #Jones Lang LaSalle Incorporated
-        "https://www.colliers.com/", #Colliers International
-        "https://www.cushmanwakefield.com/", #Cushman & Wakefield
-        "https://www.hubinternational.com/", #Hub International
-        "https://www.ajg.com/", #Arthur J. Gallagher & Co.
-        "https://www.marshmclennan.com/", #Marsh McLennan
-        "https://www.lockton.com/", #Lockton Companies
-        "https://www.assuredpartners.com/", #AssuredPartners
-        "https://www.acrisure.com/", #Acrisure
-        "https://www.ryan.com/", #Ryan, LLC
-        "https://www.alvarezandmarsal.com/", #Alvarez & Marsal
-        "https://www.protiviti.com/", #Protiviti
-        "https://www.fti consulting.com/", #FTI Consulting
-        "https://www.alixpartners.com/", #AlixPartners
-        "https://www.ghclongpoint.com/", #GHCLongPoint
-        "https://www.lincolninternational.com/", #Lincoln International
-        "https://www.airdri.com/", #Airdri
-        "https://www.atlasmachinery.com/", #Atlas Machinery
-        "https://www.bakerpetroleum.com/", #Baker Petroleum
-        "https://www.centuryprinting.com/", #Century Printing
-        "https://www.davisstandard.com/", #Davis-Standard
-        "https://www.eliteamc.com/", #Elite AMC Management
-        "https://www.fivestarchemicals.com/", #Five Star Chemicals
-        "https://www.gulfcoastfilters.com/", #Gulf Coast Filters
-        "https://www.hytrol.com/", #Hytrol Conveyor Company
-        "https://www.intercon1.com/", #Intercon 1
-        "https://www.lewiscontractors.com/", #Lewis Contractors
-        "https://www.mccormickdistilling.com/", #McCormick Distilling Company
-        "https://www.nationalgypsum.com/", #National Gypsum
-        "https://www.ocv.com/", #OCV Control Valves
-        "https://www.pattersonpump.com/", #Patterson Pump Company
-        "https://www.qualitydie.com/", #Quality Die Company
-        "https://www.reynoldsamerican.com/", #Reynolds American Inc.
-        "https://www.steelcase.com/", #Steelcase
-        "https://www.textron.com/", #Textron
-        "https://www.usg.com/", #USG Corporation
-        "https://www.valmont.com/", #Valmont Industries
-        "https://www.williamsbakery.com/", #Williams Bakery
-        "https://www.yorklabel.com/", #York Label
-        "https://www.zurn.com/", #Zurn Water Solutions
-    ]  # List of URLs to crawl
+    urls = START_URLS
     DEPTH = 2
 
-
-    process = CrawlerProcess(
-        {
-            "DEPTH_LIMIT": 2,
-            "DEPTH_PRIORITY": 10,
-            "LOG_LEVEL": "INFO",
-            "USER_AGENT": ua.random,
-            "COOKIES_ENABLED": False,
-            "ROBOTSTXT_OBEY": False,
-
-            "DEFAULT_REQUEST_HEADERS": HEADERS,
-
-            "CONCURRENT_REQUESTS": 300,
-            "CONCURRENT_REQUESTS_PER_DOMAIN": 10,
-            # "CONCURRENT_REQUESTS_PER_IP": 10,
-            "DOWNLOAD_DELAY": 2.5,
-            "DOWNLOAD_MAXSIZE": 3355443,
-            "DOWNLOAD_TIMEOUT": 120,  # Timeout for each download in seconds
-            "RETRY_ENABLED": False,
-
-            "SCHEDULER_DISK_QUEUE": "scrapy.squeues.PickleFifoDiskQueue",
-            "SCHEDULER_MEMORY_QUEUE": "scrapy.squeues.FifoMemoryQueue",
-            "SCHEDULER_PRIORITY_QUEUE": "scrapy.pqueues.DownloaderAwarePriorityQueue",
-            
-            # "CLOSESPIDER_PAGECOUNT_NO_ITEM": 30,
-            # "CLOSESPIDER_ITEMCOUNT": MAX_LIMIT*0.9*len(urls),
-            "REDIRECT_PRIORITY_ADJUST": -1,
-            "RANDOMIZE_DOWNLOAD_DELAY": True,
-            "MEMUSAGE_ENABLED": True,
-            "REACTOR_THREADPOOL_MAXSIZE": 300,
-            "ROBOTSTXT_PARSER": "scrapy.robotstxt.PythonRobotParser",
-            "ROBOTSTXT_USER_AGENT": ua.random,
-            "HTTPCACHE_ALWAYS_STORE": True,
-            "FAKEUSERAGENT_PROVIDERS" : [
-                'scrapy_fake_useragent.providers.FakeUserAgentProvider',  # This is the first provider we'll try
-                'scrapy_fake_useragent.providers.FakerProvider',  # If FakeUserAgentProvider fails, we'll use faker to generate a user-agent string for us
-                'scrapy_fake_useragent.providers.FixedUserAgentProvider',  # Fall back to USER_AGENT value
-            ],
-            # "DOWNLOAD_HANDLERS": {
-            #     "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
-            #     "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
-            # },
-            # "TWISTED_REACTOR" : "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
-            "PLAYWRIGHT_BROWSER_TYPE": "firefox",
-
-        }
-    )
+    process = CrawlerProcess(crawl_settings(ua))
 
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_location = Path(temp_dir) / "scraped_data.xlsx"
@@ -285,7 +649,7 @@ def main():
                 start_urls=urls,
                 max_depth=DEPTH,
                 output_file=temp_location,
-                allowed_patterns = patterns,
+                allowed_patterns = PATTERNS,
             )
             process.start()
 